@@ -0,0 +1,128 @@
+"""Fingerprinted, precompressed static assets.
+
+static/app.css is minified once at startup, named after a hash of its content
+and kept in memory alongside gzip (and brotli, when installed) variants. The
+URL changes whenever the file does, so browsers may cache it forever.
+
+The Inter font is self-hosted when static/fonts/Inter.woff2 (the variable
+font, weights 400-700) is present; otherwise Google Fonts is loaded without
+blocking the first paint.
+"""
+import os
+import re
+import gzip
+import hashlib
+from starlette.requests import Request
+from starlette.responses import Response
+from fasthtml.common import Link, Noscript
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+FONT_PATH = os.path.join(STATIC_DIR, 'fonts', 'Inter.woff2')
+GOOGLE_FONTS_URL = 'https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+def minify_css(css):
+    """Strip comments and whitespace. Good enough for hand written CSS without strings."""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};:,>])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+def accepted_encodings(accept_encoding):
+    """Content codings the client accepts, ignoring any refused with q=0."""
+    codings = set()
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        if name and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            codings.add(name.strip().lower())
+    return codings
+
+class Asset:
+    """One static file held in memory with its compressed variants."""
+
+    def __init__(self, name, body, media_type, compress=True):
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        self.url = f'/static/{stem}.{self.digest}{ext}'
+        self.media_type = media_type
+        self.etag = f'"{self.digest}"'
+        self.variants = {'identity': body}
+        if compress:
+            self.variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body, quality=11)
+
+    def response(self, request):
+        headers = {'Cache-Control': IMMUTABLE, 'ETag': self.etag, 'Vary': 'Accept-Encoding'}
+        if request.headers.get('if-none-match') == self.etag:
+            return Response(status_code=304, headers=headers)
+        accepted = accepted_encodings(request.headers.get('accept-encoding', ''))
+        for coding in ('br', 'gzip'):
+            if coding in self.variants and coding in accepted:
+                headers['Content-Encoding'] = coding
+                return Response(self.variants[coding], media_type=self.media_type, headers=headers)
+        return Response(self.variants['identity'], media_type=self.media_type, headers=headers)
+
+def _build():
+    assets = {}
+    font = None
+    if os.path.exists(FONT_PATH):
+        with open(FONT_PATH, 'rb') as f:
+            # woff2 is already compressed
+            font = Asset('Inter.woff2', f.read(), 'font/woff2', compress=False)
+        assets[font.url] = font
+
+    with open(os.path.join(STATIC_DIR, 'app.css')) as f:
+        css = f.read()
+    if font is not None:
+        css = ("@font-face { font-family: 'Inter'; font-style: normal; font-weight: 400 700; "
+               f"font-display: swap; src: url('{font.url}') format('woff2'); }}\n" + css)
+    stylesheet = Asset('app.css', minify_css(css).encode(), 'text/css; charset=utf-8')
+    assets[stylesheet.url] = stylesheet
+    return assets, stylesheet, font
+
+ASSETS, stylesheet, font = _build()
+
+def asset_headers():
+    """Head elements for the stylesheet and font."""
+    if font is not None:
+        fonts = (Link(rel='preload', href=font.url, **{'as': 'font'}, type='font/woff2', crossorigin=True),)
+    else:
+        # Fetched as a print stylesheet so it does not block rendering, then switched on
+        fonts = (
+            Link(rel='preconnect', href='https://fonts.googleapis.com'),
+            Link(rel='preconnect', href='https://fonts.gstatic.com', crossorigin=True),
+            Link(rel='stylesheet', href=GOOGLE_FONTS_URL, media='print', onload="this.media='all'"),
+            Noscript(Link(rel='stylesheet', href=GOOGLE_FONTS_URL))
+        )
+    return (*fonts, Link(rel='stylesheet', href=stylesheet.url))
+
+class AssetMiddleware:
+    """Serves /static/ assets ahead of the rest of the app.
+
+    Added before FastHTML's session middleware, so asset responses never
+    carry a Set-Cookie that would stop shared caches from storing them, and
+    before its catch-all static file route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not scope['path'].startswith('/static/'):
+            return await self.app(scope, receive, send)
+        scope['route_template'] = '/static/{name:path}'
+        request = Request(scope, receive)
+        asset = ASSETS.get(scope['path'])
+        if request.method not in ('GET', 'HEAD'):
+            response = Response('Method Not Allowed', status_code=405)
+        elif asset is None:
+            response = Response('Not Found', status_code=404)
+        else:
+            response = asset.response(request)
+        await response(scope, receive, send)
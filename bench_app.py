@@ -0,0 +1,203 @@
+"""Load test the app in-process against SQLite and the fake Anthropic client.
+
+Simulated students take quizzes (/quiz, /quiz/stream or /quiz/question,
+/quiz/answer, /quiz/next) and now and then manage their words (/config,
+/add-word) at each concurrency level in turn. Prints throughput and
+p50/p95/p99 latency per route and writes the results as JSON, so runs can be
+compared between commits.
+
+    python bench_app.py                                   # levels 1,4,16
+    python bench_app.py --levels 1,8,32 --questions 20 --llm-latency-ms 800 --llm-failure-rate 0.1
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+QUESTION_ID = re.compile(r'id="question-(\w+)"')
+ANSWER_URL = re.compile(r'/quiz/answer/(\w+)/\d')
+QUESTION_URL = re.compile(r'hx-get="(/quiz/question/[^"]+)"')
+OPTION_TEXT = re.compile(r'class="option-btn"[^>]*>([^<]*)<')
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--levels', default='1,4,16', help='comma separated numbers of concurrent students')
+    parser.add_argument('--questions', type=int, default=10, help='questions answered per student')
+    parser.add_argument('--accuracy', type=float, default=0.8, help='chance a student answers correctly')
+    parser.add_argument('--add-every', type=int, default=5, help='visit /config and add a word every N questions (0 to skip)')
+    parser.add_argument('--llm-latency-ms', type=float, default=300)
+    parser.add_argument('--llm-failure-rate', type=float, default=0.0)
+    parser.add_argument('--warm', action='store_true', help='pre-generate all options before the first level')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_output.txt')
+    return parser.parse_args()
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    async def request(self, client, method, url, route, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            failed = response.status_code >= 400
+        except Exception as e:
+            print(f"Request to {url} failed: {e!r}", file=sys.stderr)
+            response, failed = None, True
+        self.latencies.setdefault(route, []).append((time.perf_counter() - start) * 1000)
+        if failed:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        return response
+
+    def summary(self, elapsed):
+        total = sum(len(v) for v in self.latencies.values())
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            routes[route] = {
+                'requests': len(values),
+                'errors': self.errors.get(route, 0),
+                'p50_ms': round(percentile(values, 50), 2),
+                'p95_ms': round(percentile(values, 95), 2),
+                'p99_ms': round(percentile(values, 99), 2)
+            }
+        return {'requests': total, 'rps': round(total / elapsed, 1), 'seconds': round(elapsed, 2), 'routes': routes}
+
+async def load_question(client, recorder, html):
+    """The question id and option texts of a rendered quiz card, loading them if needed."""
+    match = QUESTION_URL.search(html)
+    if match:
+        response = await recorder.request(client, 'GET', match.group(1), '/quiz/question/{word}',
+                                          headers={'HX-Request': 'true'})
+        html = response.text if response is not None else ''
+
+    match = QUESTION_ID.search(html)
+    if match:
+        question_id = match.group(1)
+        response = await recorder.request(client, 'GET', f'/quiz/stream/{question_id}', '/quiz/stream/{question_id}')
+        if response is None or 'event: done' not in response.text:
+            return None, []
+        return question_id, json.loads(response.text.split('event: done\ndata: ', 1)[1].split('\n', 1)[0])
+
+    match = ANSWER_URL.search(html)
+    if match:
+        return match.group(1), OPTION_TEXT.findall(html)
+    return None, []
+
+async def student(client, recorder, args, rng):
+    response = await recorder.request(client, 'GET', '/quiz', '/quiz')
+    html = response.text if response is not None else ''
+    for n in range(args.questions):
+        question_id, options = await load_question(client, recorder, html)
+        if question_id is None:
+            # Round complete or a failed request; start over
+            response = await recorder.request(client, 'GET', '/quiz', '/quiz')
+            html = response.text if response is not None else ''
+            continue
+        # The fake client's correct option; fallback options are answered at random
+        correct = [i for i, text in enumerate(options) if text.startswith('The meaning of')]
+        if correct and rng.random() < args.accuracy:
+            choice = correct[0]
+        else:
+            choice = rng.randrange(3)
+        await recorder.request(client, 'GET', f'/quiz/answer/{question_id}/{choice}',
+                               '/quiz/answer/{question_id}/{answer_index}', headers={'HX-Request': 'true'})
+
+        if args.add_every and n % args.add_every == args.add_every - 1:
+            await recorder.request(client, 'GET', '/config', '/config')
+            word = 'bench ' + ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(8))
+            await recorder.request(client, 'POST', '/add-word', '/add-word', headers={'HX-Request': 'true'},
+                                   data={'new-word': word, 'q': '', 'cursor': ''})
+
+        response = await recorder.request(client, 'GET', '/quiz/next', '/quiz/next', headers={'HX-Request': 'true'})
+        html = response.text if response is not None else ''
+
+async def run_level(app, students, args):
+    import httpx
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    clients = [httpx.AsyncClient(transport=transport, base_url='http://bench') for _ in range(students)]
+    started = time.perf_counter()
+    # Seeded per level and student so runs are repeatable but students add different words
+    await asyncio.gather(*[student(client, recorder, args, random.Random(f'{args.seed}-{students}-{i}'))
+                           for i, client in enumerate(clients)])
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        await client.aclose()
+    return recorder.summary(elapsed)
+
+async def run_levels(app, levels, args):
+    # One event loop for every level, since the app keeps loop-bound state between requests
+    results = {}
+    for students in levels:
+        result = await run_level(app, students, args)
+        results[str(students)] = result
+        for route, r in result['routes'].items():
+            print(f"{students:>8} {route:<42}{r['requests']:>9}{r['errors']:>7}"
+                  f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+        print(f"{students:>8} {'total':<42}{result['requests']:>9}{'':>7}  {result['rps']} req/s")
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception:
+        return None
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='vocab-bench-')
+    # Configure the app before it is imported
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['LLM_BACKEND'] = 'fake'
+    os.environ['FAKE_LLM_LATENCY_MS'] = str(args.llm_latency_ms)
+    os.environ['FAKE_LLM_FAILURE_RATE'] = str(args.llm_failure_rate)
+    os.environ.setdefault('DB_AUTO_INIT', '1')
+    random.seed(args.seed)
+
+    try:
+        from main import app
+        from warmer import warmer
+        if args.warm:
+            warmer.warm_missing()
+            while warmer.stats()['in_flight']:
+                time.sleep(0.1)
+
+        levels = [int(level) for level in args.levels.split(',')]
+        print(f"{'students':>8} {'route':<42}{'requests':>9}{'errors':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        results = asyncio.run(run_levels(app, levels, args))
+        warmer.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'benchmark': 'app',
+        'commit': git_commit(),
+        'config': {
+            'questions': args.questions,
+            'accuracy': args.accuracy,
+            'add_every': args.add_every,
+            'llm_latency_ms': args.llm_latency_ms,
+            'llm_failure_rate': args.llm_failure_rate,
+            'warm': args.warm
+        },
+        'levels': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Compare query latency across database pooling modes.
+
+Runs the same short query from several threads against each mode and prints
+p50/p99 latency (including connection checkout) plus one JSON line per mode.
+
+    python bench_db.py                      # DATABASE_URL / POSTGRES_URL from the environment
+    python bench_db.py --url postgresql://... --threads 8 --queries 200
+"""
+import json
+import time
+import argparse
+import threading
+from sqlalchemy import text
+from database import DATABASE_URL, build_engine
+
+# (label, pool mode, seconds idle before a ping)
+MODES = [
+    ('null', 'null', -1),
+    ('queue', 'queue', -1),
+    ('queue+ping-stale', 'queue', 60),
+    ('queue+ping-always', 'queue', 0),
+]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run_mode(url, mode, ping_after, threads, queries):
+    engine = build_engine(url, mode=mode, ping_after=ping_after)
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(queries):
+            start = time.perf_counter()
+            with engine.connect() as conn:
+                conn.execute(text('SELECT 1')).scalar()
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    stats = engine.pool_stats.as_dict(engine)
+    engine.dispose()
+    return {
+        'queries': len(latencies),
+        'qps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'connects': stats['connects'],
+        'pings': stats['pings']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=DATABASE_URL)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--queries', type=int, default=100, help='queries per thread')
+    args = parser.parse_args()
+
+    print(f"{'mode':<20}{'p50 ms':>10}{'p99 ms':>10}{'qps':>10}{'connects':>10}{'pings':>8}")
+    results = {}
+    # Pool modes only apply to Postgres; SQLite always gets its own profile
+    modes = MODES if args.url.startswith('postgres') else [('sqlite', 'auto', -1)]
+    for label, mode, ping_after in modes:
+        result = run_mode(args.url, mode, ping_after, args.threads, args.queries)
+        results[label] = result
+        print(f"{label:<20}{result['p50_ms']:>10}{result['p99_ms']:>10}{result['qps']:>10}"
+              f"{result['connects']:>10}{result['pings']:>8}")
+    print(json.dumps({'benchmark': 'db_pool', 'threads': args.threads, 'results': results}))
+
+if __name__ == '__main__':
+    main()
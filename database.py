@@ -1,9 +1,19 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, UniqueConstraint, Index, func, and_, or_, select, update, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import datetime, timedelta
+import json
+import time
+import threading
 from dotenv import load_dotenv
+import metrics
+from metrics import instrument_engine
 
 load_dotenv()
 
@@ -15,26 +25,206 @@ DATABASE_URL = (
     'sqlite:///vocab.db'
 )
 
-print(f"Database URL being used: {DATABASE_URL[:50]}...")  # Print first 50 chars for debugging
-
 # Handle Vercel Postgres URL format
 if DATABASE_URL.startswith('postgres://'):
     DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
 
-# Create engine with proper connection settings for Vercel Postgres
-if 'postgresql://' in DATABASE_URL:
-    # Vercel Postgres settings
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,  # Verify connections before use
-        pool_recycle=3600,   # Recycle connections after 1 hour
-        connect_args={"sslmode": "require"}  # SSL for Postgres
-    )
-else:
-    # Local SQLite settings
-    engine = create_engine(DATABASE_URL)
+# Create tables and seed default words on first use. Set DB_AUTO_INIT=0 when
+# running `python database.py` as a deploy step instead, so serverless cold
+# starts skip the schema check entirely.
+AUTO_INIT = os.getenv('DB_AUTO_INIT', '1') != '0'
+
+# The engine is created on first use rather than at import time
+engine = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+_init_lock = threading.RLock()
+_initialized = False
+
+# Connection pooling for Postgres. DB_POOL_MODE is one of:
+#   auto  - null on serverless platforms or behind a PgBouncer-style pooled URL, else queue
+#   null  - no pool in this process; every session opens a connection (the pooler reuses them)
+#   queue - a small fixed pool that reuses the most recently returned connection (LIFO)
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'auto')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', '5'))
+# Pooled connections idle for longer than this many seconds are pinged before
+# reuse; 0 pings on every checkout and a negative value never pings
+DB_PING_AFTER = float(os.getenv('DB_PING_AFTER', '60'))
+
+def _is_pooled_url(url):
+    """True for URLs that point at a connection pooler such as PgBouncer or Neon's pooler."""
+    return ('pgbouncer' in url.query or '-pooler.' in (url.host or '') or url.port == 6543)
+
+def resolve_pool_mode(url, mode=DB_POOL_MODE):
+    if url.get_backend_name() != 'postgresql':
+        return 'sqlite'
+    if mode != 'auto':
+        return mode
+    serverless = os.getenv('VERCEL') or os.getenv('AWS_LAMBDA_FUNCTION_NAME')
+    return 'null' if serverless or _is_pooled_url(url) else 'queue'
+
+class PoolStats:
+    """Counters for pool activity, fed by engine events."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.connects = 0
+        self.checkouts = 0
+        self.pings = 0
+        self.ping_failures = 0
+
+    def as_dict(self, engine):
+        stats = {'mode': self.mode, 'connects': self.connects, 'checkouts': self.checkouts,
+                 'pings': self.pings, 'ping_failures': self.ping_failures}
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return stats
+
+def _track_pool(engine, stats, ping_after):
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, record):
+        stats.connects += 1
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, record):
+        record.info['checked_in_at'] = time.monotonic()
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, record, proxy):
+        stats.checkouts += 1
+        if ping_after < 0:
+            return
+        checked_in_at = record.info.get('checked_in_at')
+        # Only connections that sat idle long enough to have gone stale are pinged
+        if checked_in_at is not None and time.monotonic() - checked_in_at > ping_after:
+            stats.pings += 1
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            except Exception:
+                stats.ping_failures += 1
+                # Makes the pool discard this connection and try a fresh one
+                raise exc.DisconnectionError()
+            finally:
+                cursor.close()
+
+# SQLite tuning for local and single-box deployments
+SQLITE_POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', '8'))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_KB = int(os.getenv('SQLITE_CACHE_KB', '65536'))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+def _build_sqlite_engine(url):
+    """SQLite with WAL so readers and the writer do not block each other.
+
+    synchronous=NORMAL is safe under WAL and only fsyncs at checkpoints rather
+    than on every commit. Connections are pooled across FastHTML's worker
+    threads; an in-memory database shares one connection, since each new
+    connection would otherwise see its own empty database.
+    """
+    connect_args = {'check_same_thread': False, 'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}
+    if url.database in (None, '', ':memory:'):
+        new_engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        new_engine = create_engine(url, connect_args=connect_args, poolclass=QueuePool,
+                                   pool_size=SQLITE_POOL_SIZE, max_overflow=SQLITE_POOL_SIZE)
+
+    @event.listens_for(new_engine, 'connect')
+    def set_pragmas(dbapi_connection, record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+            cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_KB}')
+            cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+        finally:
+            cursor.close()
+
+    return new_engine
+
+def build_engine(database_url=None, mode=DB_POOL_MODE, ping_after=DB_PING_AFTER):
+    """Create an engine for database_url with the pooling mode resolved for this environment."""
+    url = make_url(database_url or DATABASE_URL)
+    mode = resolve_pool_mode(url, mode)
+    if mode == 'sqlite':
+        new_engine = _build_sqlite_engine(url)
+    else:
+        # psycopg2 does not understand the pooler hint, it is only used to pick the mode
+        url = url.difference_update_query(['pgbouncer'])
+        # SSL for Vercel Postgres
+        options = dict(connect_args={"sslmode": "require"})
+        if mode == 'null':
+            options.update(poolclass=NullPool)
+        else:
+            options.update(
+                poolclass=QueuePool,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_POOL_MAX_OVERFLOW,
+                pool_use_lifo=True,  # Lets surplus idle connections time out server-side
+                pool_recycle=3600    # Recycle connections after 1 hour
+            )
+        new_engine = create_engine(url, **options)
+    new_engine.pool_stats = PoolStats(mode)
+    instrument_engine(new_engine)
+    # Connects and checkouts are counted in every mode; only pooled Postgres
+    # connections are pinged, since others are new or local and cannot go stale
+    _track_pool(new_engine, new_engine.pool_stats, ping_after if mode == 'queue' else -1)
+    return new_engine
+
+def _create_engine():
+    print(f"Database URL being used: {DATABASE_URL[:50]}...")  # Print first 50 chars for debugging
+    new_engine = build_engine()
+    print(f"Database pool mode: {new_engine.pool_stats.mode}")
+    return new_engine
+
+def pool_stats():
+    """Pool mode and activity for /api/stats, or None before the engine exists."""
+    return engine.pool_stats.as_dict(engine) if engine is not None else None
+
+def _pool_stat(name):
+    stats = pool_stats()
+    return stats.get(name) if stats else None
+
+metrics.register(metrics.Callback(
+    'db_pool_info', 'The database pooling mode in use (null, queue or sqlite), as a label.',
+    lambda: [({'mode': engine.pool_stats.mode}, 1)] if engine is not None else None))
+metrics.register(metrics.Callback('db_pool_connects_total', 'New database connections opened.',
+                                  lambda: _pool_stat('connects'), 'counter'))
+metrics.register(metrics.Callback('db_pool_checkouts_total', 'Connections checked out of the pool.',
+                                  lambda: _pool_stat('checkouts'), 'counter'))
+metrics.register(metrics.Callback('db_pool_pings_total', 'Idle connections pinged before reuse.',
+                                  lambda: _pool_stat('pings'), 'counter'))
+metrics.register(metrics.Callback('db_pool_checked_out', 'Connections currently checked out.',
+                                  lambda: _pool_stat('checked_out')))
+
+def get_engine():
+    global engine
+    if engine is None:
+        with _init_lock:
+            if engine is None:
+                engine = _create_engine()
+                SessionLocal.configure(bind=engine)
+    return engine
+
+def get_session():
+    """A new Session, creating the engine (and schema, if DB_AUTO_INIT) on first use."""
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                get_engine()
+                if AUTO_INIT:
+                    try:
+                        init_db()
+                    except Exception as e:
+                        print(f"Warning: Could not initialize database: {e}")
+                        print(f"Database URL being attempted: {DATABASE_URL}")
+                _initialized = True
+    return SessionLocal()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 class VocabWord(Base):
@@ -45,43 +235,195 @@ class VocabWord(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
 
-# Create tables with error handling
-try:
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully")
-    
-    # Test the connection by trying a simple query
-    db = SessionLocal()
+# Case-insensitive ordering and search for the word list
+Index('ix_vocab_words_word_lower', func.lower(VocabWord.word))
+
+class Counter(Base):
+    """Named integer counters, e.g. the word list version other instances poll."""
+    __tablename__ = "counters"
+
+    name = Column(String(64), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class QuizOptionSet(Base):
+    """Generated multiple choice options for a word, correct option first."""
+    __tablename__ = "quiz_option_sets"
+    __table_args__ = (
+        # Also serves as the lookup index for get_option_set
+        UniqueConstraint('word', 'model', 'prompt_version', name='uq_quiz_option_sets_key'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    word = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    prompt_version = Column(Integer, nullable=False)
+    options = Column(Text, nullable=False)  # JSON list of option strings
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class QuizSession(Base):
+    """Quiz progress for one browser session, serialized by quiz_session.py."""
+    __tablename__ = "quiz_sessions"
+
+    id = Column(String(32), primary_key=True)
+    state = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class QuizDeck(Base):
+    """The word order of a session's current round, written once per round."""
+    __tablename__ = "quiz_decks"
+
+    id = Column(String(32), primary_key=True)
+    round_id = Column(String(16), nullable=False)
+    deck = Column(Text, nullable=False)  # JSON list of word ids
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class QuizAttempt(Base):
+    """One answered question, kept as history for the scheduler."""
+    __tablename__ = "quiz_attempts"
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String(32), nullable=False, index=True)
+    word_id = Column(Integer, nullable=False, index=True)
+    correct = Column(Boolean, nullable=False)
+    latency_ms = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class WordProgress(Base):
+    """Leitner box and next due time for a word in one session."""
+    __tablename__ = "word_progress"
+    __table_args__ = (
+        # The scheduler's "due" priority queue
+        Index('ix_word_progress_due', 'session_id', 'due_at'),
+    )
+
+    session_id = Column(String(32), primary_key=True)
+    word_id = Column(Integer, primary_key=True)
+    box = Column(Integer, nullable=False, default=0)
+    due_at = Column(DateTime, nullable=False)
+
+def _insert(db, model):
+    """INSERT for the session's dialect, with ON CONFLICT support on SQLite and Postgres."""
+    dialect = postgresql if db.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
+
+def get_db():
+    db = get_session()
     try:
-        db.execute('SELECT 1')
-        print("Database connection test successful")
-    except Exception as test_e:
-        print(f"Database connection test failed: {test_e}")
+        yield db
     finally:
         db.close()
-        
-except Exception as e:
-    print(f"Warning: Could not create database tables: {e}")
-    print(f"Database URL being attempted: {DATABASE_URL}")
 
-def get_db():
-    db = SessionLocal()
+WORD_LIST_VERSION = 'word_list_version'
+# Seconds a cached word list is trusted before the version row is checked again
+WORD_CACHE_TTL = float(os.getenv('WORD_CACHE_TTL', '2'))
+
+def _bump_word_list_version(db):
+    """Increment the word list version inside the caller's transaction and return it."""
+    return db.execute(
+        update(Counter).where(Counter.name == WORD_LIST_VERSION)
+        .values(value=Counter.value + 1).returning(Counter.value)
+    ).scalar()
+
+def get_word_list_version():
+    db = get_session()
     try:
-        yield db
+        return db.execute(select(Counter.value).where(Counter.name == WORD_LIST_VERSION)).scalar()
     finally:
         db.close()
 
+class WordListCache:
+    """The active word list as a tuple of (id, word), shared by this process.
+
+    Writes made here patch the cache directly. Writes from other instances are
+    noticed by re-reading the version counter at most every WORD_CACHE_TTL
+    seconds, so reads are normally a lookup with no query at all.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._rows = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lookups = None
+        self.reloads = 0
+
+    def get(self):
+        rows = self._rows
+        if rows is not None and time.monotonic() - self._checked_at < self.ttl:
+            return rows
+        with self._lock:
+            if self._rows is None or time.monotonic() - self._checked_at >= self.ttl:
+                version = get_word_list_version()
+                if self._rows is None or version != self._version:
+                    self._rows = tuple((row.id, row.word) for row in iter_active_words())
+                    self._version = version
+                    self.reloads += 1
+                self._checked_at = time.monotonic()
+            return self._rows
+
+    def version(self):
+        self.get()
+        return self._version
+
+    def lookups(self):
+        """({word: id}, {id: word}) for the current rows, built once per change to the list."""
+        rows = self.get()
+        lookups = self._lookups
+        if lookups is None or lookups[0] is not rows:
+            lookups = self._lookups = (rows, {word: word_id for word_id, word in rows}, dict(rows))
+        return lookups[1], lookups[2]
+
+    def added(self, rows, version):
+        with self._lock:
+            # Patch only if no other write happened in between; otherwise reload lazily
+            if self._rows is not None and version is not None and self._version == version - 1:
+                self._rows = self._rows + tuple(rows)
+                self._version = version
+            else:
+                self._rows = None
+
+    def removed(self, word_id, version):
+        with self._lock:
+            if self._rows is not None and version is not None and self._version == version - 1:
+                self._rows = tuple(row for row in self._rows if row[0] != word_id)
+                self._version = version
+            else:
+                self._rows = None
+
+    def invalidate(self):
+        with self._lock:
+            self._rows = None
+
+word_list_cache = WordListCache(WORD_CACHE_TTL)
+
+def cached_word_list_version():
+    """The word list version this process last saw, checked at most every WORD_CACHE_TTL seconds."""
+    return word_list_cache.version()
+
+def cached_active_words():
+    """The active words as (id, word) tuples, usually without touching the database."""
+    return word_list_cache.get()
+
+def cached_word_lookups():
+    """({word: id}, {id: word}) for the active words, from the same cache."""
+    return word_list_cache.lookups()
+
 def add_word(word: str):
+    """Add a word. Returns its new id, or False if it already exists or failed."""
     try:
-        db = SessionLocal()
+        db = get_session()
         try:
-            existing = db.query(VocabWord).filter(VocabWord.word == word).first()
+            existing = db.query(VocabWord.id).filter(VocabWord.word == word).first()
             if not existing:
                 vocab_word = VocabWord(word=word.strip())
                 db.add(vocab_word)
+                db.flush()
+                version = _bump_word_list_version(db)
                 db.commit()
+                word_list_cache.added([(vocab_word.id, vocab_word.word)], version)
                 print(f"Successfully added word: {word}")
-                return True
+                return vocab_word.id
             print(f"Word already exists: {word}")
             return False
         finally:
@@ -90,29 +432,271 @@ def add_word(word: str):
         print(f"Error adding word '{word}': {e}")
         return False
 
+def add_words(words, chunk_size: int = 500):
+    """Insert many words with chunked multi-row INSERT ... ON CONFLICT DO NOTHING.
+
+    Returns the words that were actually inserted; the rest already existed.
+    """
+    inserted = []
+    db = get_session()
+    try:
+        now = datetime.utcnow()
+        for start in range(0, len(words), chunk_size):
+            chunk = words[start:start + chunk_size]
+            result = db.execute(_insert(db, VocabWord).values(
+                [{'word': word, 'created_at': now, 'is_active': True} for word in chunk]
+            ).on_conflict_do_nothing(index_elements=['word']).returning(VocabWord.id, VocabWord.word))
+            inserted.extend((row.id, row.word) for row in result)
+        version = _bump_word_list_version(db) if inserted else None
+        db.commit()
+        if inserted:
+            word_list_cache.added(inserted, version)
+        print(f"Imported {len(inserted)} of {len(words)} words")
+        return [word for _, word in inserted]
+    finally:
+        db.close()
+
 def remove_word(word_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
         word = db.query(VocabWord).filter(VocabWord.id == word_id).first()
         if word:
             db.delete(word)
+            db.query(WordProgress).filter(WordProgress.word_id == word_id).delete()
+            version = _bump_word_list_version(db)
             db.commit()
+            word_list_cache.removed(word_id, version)
             return True
         return False
     finally:
         db.close()
 
-def get_all_words():
-    db = SessionLocal()
+def count_words():
+    return len(word_list_cache.get())
+
+def get_previous_word_id(word: str, query: str = '', match: str = 'prefix'):
+    """Id of the active word listed just before this one, or None if it would be first.
+
+    Uses the same ordering and search filter as get_words_page.
+    """
+    db = get_session()
     try:
-        return db.query(VocabWord).filter(VocabWord.is_active == True).all()
+        lower_word = func.lower(VocabWord.word)
+        q = db.query(VocabWord.id).filter(VocabWord.is_active == True, lower_word < word.lower())
+        if query:
+            q = q.filter(_search_filter(lower_word, query, match))
+        row = q.order_by(lower_word.desc(), VocabWord.id.desc()).first()
+        return row.id if row else None
     finally:
         db.close()
 
-def get_active_words():
-    db = SessionLocal()
+def _contains_pattern(query: str):
+    escaped = query.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+def _search_filter(lower_word, query: str, match: str = 'prefix'):
+    """Words starting with query, as a range seek on the lower(word) index, or
+    with match='contains' words containing it anywhere, which has to scan it."""
+    if match == 'contains':
+        return lower_word.like(_contains_pattern(query), escape='\\')
+    query = query.lower()
+    return and_(lower_word >= query, lower_word < query + '\uffff')
+
+def get_words_page(after=None, after_id=0, query='', limit: int = 100, match: str = 'prefix'):
+    """One page of active words ordered by lower(word), as (id, word) rows.
+
+    Keyset pagination: pass the last row's lower(word) and id to get the next
+    page, so every page is an index range scan no matter how deep it is. A
+    query keeps only words starting with it, which narrows the same range scan;
+    with match='contains' it keeps words containing it anywhere, and the
+    ordered index scan stops as soon as the page is full.
+    """
+    db = get_session()
+    try:
+        lower_word = func.lower(VocabWord.word)
+        q = db.query(VocabWord.id, VocabWord.word).filter(VocabWord.is_active == True)
+        if after is not None:
+            # Spelled out rather than as a row value so the index is used as a range seek
+            q = q.filter(lower_word >= after, or_(lower_word > after, VocabWord.id > after_id))
+        if query:
+            q = q.filter(_search_filter(lower_word, query, match))
+        return q.order_by(lower_word, VocabWord.id).limit(limit).all()
+    finally:
+        db.close()
+
+def iter_active_words(batch_size: int = 1000):
+    """Stream active words as (id, word) rows, fetching batch_size rows at a time."""
+    db = get_session()
+    try:
+        stmt = select(VocabWord.id, VocabWord.word).where(VocabWord.is_active == True)
+        yield from db.execute(stmt.execution_options(yield_per=batch_size))
+    finally:
+        db.close()
+
+def _models(models):
+    return [models] if isinstance(models, str) else list(models)
+
+def get_option_set(word: str, models, prompt_version: int):
+    """Return the cached options for a word from any of the given models, or None.
+
+    models is one model name or a list in order of preference.
+    """
+    models = _models(models)
+    db = get_session()
+    try:
+        rows = db.query(QuizOptionSet.model, QuizOptionSet.options).filter(
+            QuizOptionSet.word == word,
+            QuizOptionSet.model.in_(models),
+            QuizOptionSet.prompt_version == prompt_version
+        ).all()
+        if not rows:
+            return None
+        row = min(rows, key=lambda row: models.index(row.model))
+        return json.loads(row.options)
+    finally:
+        db.close()
+
+def save_option_set(word: str, model: str, prompt_version: int, options):
+    db = get_session()
+    try:
+        db.add(QuizOptionSet(word=word, model=model, prompt_version=prompt_version,
+                             options=json.dumps(options)))
+        db.commit()
+        return True
+    except IntegrityError:
+        # Another request stored this word first, which is just as good
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+def save_option_sets(model: str, prompt_version: int, option_sets: dict):
+    """Store many {word: options} at once, skipping words that already have a set."""
+    if not option_sets:
+        return 0
+    db = get_session()
+    try:
+        result = db.execute(_insert(db, QuizOptionSet).values([
+            {'word': word, 'model': model, 'prompt_version': prompt_version,
+             'options': json.dumps(options), 'created_at': datetime.utcnow()}
+            for word, options in option_sets.items()
+        ]).on_conflict_do_nothing(index_elements=['word', 'model', 'prompt_version']))
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+def get_stored_definitions(batch_size: int = 500):
+    """Stream (word, correct option) for every stored option set."""
+    db = get_session()
     try:
-        return db.query(VocabWord).filter(VocabWord.is_active == True).all()
+        stmt = select(QuizOptionSet.word, QuizOptionSet.options)
+        for row in db.execute(stmt.execution_options(yield_per=batch_size)):
+            yield row.word, json.loads(row.options)[0]
+    finally:
+        db.close()
+
+def get_words_missing_options(models, prompt_version: int):
+    """Active words that have no stored option set from any of these models for this prompt."""
+    models = _models(models)
+    db = get_session()
+    try:
+        rows = db.query(VocabWord.word).outerjoin(
+            QuizOptionSet,
+            (QuizOptionSet.word == VocabWord.word) &
+            (QuizOptionSet.model.in_(models)) &
+            (QuizOptionSet.prompt_version == prompt_version)
+        ).filter(VocabWord.is_active == True, QuizOptionSet.id == None).distinct().all()
+        return [row.word for row in rows]
+    finally:
+        db.close()
+
+def load_quiz_state(session_id: str):
+    db = get_session()
+    try:
+        row = db.query(QuizSession.state).filter(QuizSession.id == session_id).first()
+        return row.state if row else None
+    finally:
+        db.close()
+
+def save_quiz_state(session_id: str, state: str):
+    """Insert or overwrite a session's state in a single statement."""
+    db = get_session()
+    try:
+        stmt = _insert(db, QuizSession).values(id=session_id, state=state, updated_at=datetime.utcnow())
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[QuizSession.id],
+            set_={'state': stmt.excluded.state, 'updated_at': stmt.excluded.updated_at}
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+def load_quiz_deck(session_id: str):
+    """(round id, deck) stored for a session, or None."""
+    db = get_session()
+    try:
+        row = db.query(QuizDeck.round_id, QuizDeck.deck).filter(QuizDeck.id == session_id).first()
+        return (row.round_id, row.deck) if row else None
+    finally:
+        db.close()
+
+def save_quiz_deck(session_id: str, round_id: str, deck: str):
+    """Insert or overwrite a session's deck in a single statement."""
+    db = get_session()
+    try:
+        stmt = _insert(db, QuizDeck).values(id=session_id, round_id=round_id, deck=deck,
+                                            updated_at=datetime.utcnow())
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[QuizDeck.id],
+            set_={'round_id': stmt.excluded.round_id, 'deck': stmt.excluded.deck,
+                  'updated_at': stmt.excluded.updated_at}
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+def record_attempt(session_id: str, word: str, correct: bool, latency_ms, intervals):
+    """Log an answer and move the word between Leitner boxes in one transaction.
+
+    intervals[box] is how long a word in that box waits before it is due again.
+    A correct answer moves the word up a box; a wrong one sends it back to box 0.
+    """
+    db = get_session()
+    try:
+        row = db.query(VocabWord.id, WordProgress.box).outerjoin(
+            WordProgress,
+            (WordProgress.word_id == VocabWord.id) & (WordProgress.session_id == session_id)
+        ).filter(VocabWord.word == word).first()
+        if row is None:
+            return False
+        box = min((row.box or 0) + 1, len(intervals) - 1) if correct else 0
+        now = datetime.utcnow()
+        db.add(QuizAttempt(session_id=session_id, word_id=row.id, correct=correct,
+                           latency_ms=latency_ms, created_at=now))
+        stmt = _insert(db, WordProgress).values(session_id=session_id, word_id=row.id, box=box,
+                                                due_at=now + timedelta(seconds=intervals[box]))
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[WordProgress.session_id, WordProgress.word_id],
+            set_={'box': stmt.excluded.box, 'due_at': stmt.excluded.due_at}
+        ))
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+def get_due_words(session_id: str, limit: int):
+    """Words due for review in this session, most overdue first (an index range scan)."""
+    db = get_session()
+    try:
+        rows = db.query(VocabWord.word).join(
+            WordProgress, WordProgress.word_id == VocabWord.id
+        ).filter(
+            WordProgress.session_id == session_id,
+            WordProgress.due_at <= datetime.utcnow(),
+            VocabWord.is_active == True
+        ).order_by(WordProgress.due_at).limit(limit).all()
+        return [row.word for row in rows]
     finally:
         db.close()
 
@@ -139,16 +723,32 @@ def init_default_words():
         ]
         
         print(f"Initializing database with {len(default_words)} default words")
-        for word in default_words:
-            vocab_word = VocabWord(word=word)
-            db.add(vocab_word)
+        # Instances racing to seed an empty table skip each other's rows
+        db.execute(_insert(db, VocabWord).values(
+            [{'word': word, 'created_at': datetime.utcnow(), 'is_active': True} for word in default_words]
+        ).on_conflict_do_nothing(index_elements=['word']))
+        _bump_word_list_version(db)
         db.commit()
         print("Default words added successfully")
     finally:
         db.close()
 
-# Initialize database with default words on first run only
-try:
-    init_default_words()
-except Exception as e:
-    print(f"Warning: Could not initialize default words: {e}")
\ No newline at end of file
+def init_db(seed=True):
+    """Create any missing tables and seed the default words. Safe to run repeatedly."""
+    Base.metadata.create_all(bind=get_engine())
+    # create_all skips existing tables, so add indexes introduced since they were made
+    with get_engine().begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+    with SessionLocal() as db:
+        db.execute(_insert(db, Counter).values(name=WORD_LIST_VERSION, value=0)
+                   .on_conflict_do_nothing(index_elements=['name']))
+        db.commit()
+    print("Database tables created successfully")
+    if seed:
+        init_default_words()
+
+if __name__ == '__main__':
+    # Explicit migration step, e.g. as a deploy command alongside DB_AUTO_INIT=0
+    init_db()
\ No newline at end of file
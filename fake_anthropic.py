@@ -0,0 +1,142 @@
+"""Offline stand-in for the Anthropic client.
+
+Set LLM_BACKEND=fake to run the app, the option warmer or local tests without
+an API key or network access. Only the parts of the SDK this app uses are
+implemented.
+
+FAKE_LLM_LATENCY_MS adds a delay to every call (varied by +/-50%) and
+FAKE_LLM_FAILURE_RATE makes that fraction of calls fail, to see how the app
+behaves with a slow or flaky API.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+from types import SimpleNamespace
+
+LATENCY_MS = float(os.getenv('FAKE_LLM_LATENCY_MS', '0'))
+FAILURE_RATE = float(os.getenv('FAKE_LLM_FAILURE_RATE', '0'))
+
+class FakeAPIError(Exception):
+    pass
+
+def _options(word):
+    return [
+        {'text': f"The meaning of {word}", 'correct': True},
+        {'text': f"Something {word} does not mean", 'correct': False},
+        {'text': f"Another thing {word} does not mean", 'correct': False}
+    ]
+
+def _delay():
+    return LATENCY_MS / 1000 * random.uniform(0.5, 1.5)
+
+class _FakeMessages:
+    def __init__(self, client):
+        self._client = client
+
+    def _respond(self, model, messages, system=None, tool_choice=None):
+        self._client.calls += 1
+        if FAILURE_RATE and random.random() < FAILURE_RATE:
+            raise FakeAPIError('Simulated API failure')
+        # The word and requested position are in the first turn; later turns are repairs
+        prompt = messages[0]['content']
+        if 'WORDS: ' in prompt:
+            words = json.loads(prompt.split('WORDS: ', 1)[1])
+            arguments = {'items': [{'word': w, 'options': _options(w)} for w in words]}
+        else:
+            word = prompt.split('"')[1] if '"' in prompt else 'word'
+            options = _options(word)
+            # Honour a request for the correct option somewhere other than first
+            for position, ordinal in enumerate(('first', 'second', 'third')):
+                if f'The {ordinal} one must be the CORRECT' in prompt:
+                    options.insert(position, options.pop(0))
+            arguments = {'options': options}
+        text = json.dumps(arguments)
+        if tool_choice:
+            self._client.tool_calls += 1
+            block = SimpleNamespace(type='tool_use', id=f'toolu_fake_{self._client.tool_calls}',
+                                    name=tool_choice['name'], input=arguments)
+        else:
+            block = SimpleNamespace(type='text', text=text)
+        # A system prompt marked for caching is written to the cache once, then read
+        cached = ''.join(part['text'] for part in system or [] if isinstance(part, dict)
+                         and part.get('cache_control'))
+        cache_write = cache_read = 0
+        if cached:
+            if (model, cached) in self._client.cached:
+                cache_read = len(cached) // 4
+            else:
+                self._client.cached.add((model, cached))
+                cache_write = len(cached) // 4
+        return SimpleNamespace(
+            model=model,
+            content=[block],
+            stop_reason='tool_use' if tool_choice else 'end_turn',
+            usage=SimpleNamespace(input_tokens=len(json.dumps(messages)) // 4, output_tokens=len(text) // 4,
+                                  cache_creation_input_tokens=cache_write, cache_read_input_tokens=cache_read)
+        )
+
+    def create(self, model, messages, max_tokens=1000, system=None, tool_choice=None, **kwargs):
+        time.sleep(_delay())
+        return self._respond(model, messages, system, tool_choice)
+
+class FakeAnthropic:
+    """Returns deterministic, well-formed options for any word, as a tool call when one is forced."""
+
+    def __init__(self, **kwargs):
+        self.calls = 0
+        self.tool_calls = 0
+        self.cached = set()
+        self.messages = _FakeMessages(self)
+
+class _FakeAsyncMessages(_FakeMessages):
+    async def create(self, model, messages, max_tokens=1000, system=None, tool_choice=None, **kwargs):
+        await asyncio.sleep(_delay())
+        return self._respond(model, messages, system, tool_choice)
+
+    def stream(self, model, messages, max_tokens=1000, system=None, tool_choice=None, **kwargs):
+        return _FakeStream(lambda: self._respond(model, messages, system, tool_choice))
+
+class _FakeStream:
+    """Async context manager over the events of a streamed response.
+
+    Only the text and input_json events are produced.
+    """
+
+    def __init__(self, respond, chunk_size=8):
+        self._respond = respond
+        self._chunk_size = chunk_size
+        self._message = None
+
+    async def __aenter__(self):
+        self._message = self._respond()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        block = self._message.content[0]
+        if block.type == 'tool_use':
+            text, event_type, field = json.dumps(block.input), 'input_json', 'partial_json'
+        else:
+            text, event_type, field = block.text, 'text', 'text'
+        chunks = [text[i:i + self._chunk_size] for i in range(0, len(text), self._chunk_size)]
+        # The call's latency is spread over the chunks, like tokens arriving
+        pause = _delay() / len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(pause)
+            yield SimpleNamespace(type=event_type, **{field: chunk})
+
+    async def get_final_message(self):
+        return self._message
+
+class FakeAsyncAnthropic:
+    """Async counterpart of FakeAnthropic."""
+
+    def __init__(self, **kwargs):
+        self.calls = 0
+        self.tool_calls = 0
+        self.cached = set()
+        self.messages = _FakeAsyncMessages(self)
@@ -0,0 +1,124 @@
+"""Response compression and conditional GETs.
+
+HttpCacheMiddleware compresses text responses above COMPRESS_MIN_SIZE with
+brotli or gzip, whichever the client prefers and is available. Paths with a
+registered validator, such as the word list pages, also get an ETag built
+from it, so a repeat request with If-None-Match is answered with 304 before
+the page is rendered at all.
+"""
+import os
+import gzip
+import asyncio
+import hashlib
+from starlette.datastructures import Headers, MutableHeaders
+from assets import accepted_encodings, brotli
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '500'))
+_COMPRESSIBLE = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
+def build_id(*paths):
+    """A short hash of the files that render pages, so a deploy changes every ETag."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def _compress(body, coding):
+    if coding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+def _add_vary(headers, *names):
+    current = [v.strip() for v in headers.get('vary', '').split(',') if v.strip()]
+    for name in names:
+        if name.lower() not in (v.lower() for v in current):
+            current.append(name)
+    headers['Vary'] = ', '.join(current)
+
+class HttpCacheMiddleware:
+    def __init__(self, app, validators=None, build='', minimum_size=COMPRESS_MIN_SIZE):
+        self.app = app
+        self.validators = validators or {}
+        self.build = build
+        self.minimum_size = minimum_size
+
+    async def _etag(self, scope, request_headers):
+        validator = self.validators.get(scope['path'])
+        if validator is None or scope['method'] not in ('GET', 'HEAD'):
+            return None
+        try:
+            # Validators may touch the database, so keep them off the event loop
+            value = await asyncio.to_thread(validator)
+        except Exception as e:
+            print(f"Error computing ETag: {e}")
+            return None
+        if value is None:
+            return None
+        # HTMX requests get a fragment and normal ones a full page from the same URL
+        key = '|'.join((self.build, scope['path'], scope.get('query_string', b'').decode('latin-1'),
+                        request_headers.get('hx-request', ''), str(value)))
+        return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:16] + '"'
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        request_headers = Headers(scope=scope)
+        etag = await self._etag(scope, request_headers)
+        if etag is not None:
+            if_none_match = request_headers.get('if-none-match', '')
+            if etag in (tag.strip() for tag in if_none_match.split(',')):
+                headers = MutableHeaders(raw=[])
+                headers['ETag'] = etag
+                headers['Cache-Control'] = 'no-cache'
+                _add_vary(headers, 'HX-Request', 'Accept-Encoding')
+                await send({'type': 'http.response.start', 'status': 304, 'headers': headers.raw})
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+
+        accepted = accepted_encodings(request_headers.get('accept-encoding', ''))
+        if brotli is not None and 'br' in accepted:
+            coding = 'br'
+        elif 'gzip' in accepted:
+            coding = 'gzip'
+        else:
+            coding = None
+
+        start = None
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(raw=message['headers'])
+                if etag is not None and message['status'] == 200:
+                    headers['ETag'] = etag
+                    headers['Cache-Control'] = 'no-cache'
+                    _add_vary(headers, 'HX-Request')
+                content_type = headers.get('content-type', '')
+                # Event streams are left alone so each event is delivered as it is sent
+                if (content_type.startswith(_COMPRESSIBLE) and not content_type.startswith('text/event-stream')
+                        and 'content-encoding' not in headers and message['status'] not in (204, 304)):
+                    _add_vary(headers, 'Accept-Encoding')
+                    if coding is not None:
+                        # Held back until the body is complete and its size is known
+                        start = message
+                        return
+                await send(message)
+            elif start is None:
+                await send(message)
+            else:
+                chunks.append(message.get('body', b''))
+                if message.get('more_body', False):
+                    return
+                body = b''.join(chunks)
+                headers = MutableHeaders(raw=start['headers'])
+                if len(body) >= self.minimum_size:
+                    body = _compress(body, coding)
+                    headers['Content-Encoding'] = coding
+                    headers['Content-Length'] = str(len(body))
+                await send(start)
+                await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,175 @@
+"""Offline quiz options built from the local word bank.
+
+Used when Claude is unavailable. The correct option is the word's definition
+from the bundled definitions.json or a previously generated option set, and
+the distractors are definitions of other words, ranked by how closely they
+resemble the correct one (part of speech, length, word shape). Everything is
+indexed in memory so building a question takes microseconds.
+
+Stored option sets are read from the database once, by load_stored on a
+worker thread, so building a question never waits on the network.
+"""
+import os
+import re
+import json
+import random
+import threading
+from bisect import bisect_left, bisect_right
+
+try:
+    from database import get_stored_definitions
+except Exception as e:
+    print(f"Warning: Stored definitions unavailable: {e}")
+    def get_stored_definitions(): return iter(())
+
+DEFINITIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'definitions.json')
+
+# Candidates either side of the correct option's length that are scored
+_WINDOW = 8
+_WORD_RE = re.compile(r"[a-z']+")
+
+def _tokens(definition):
+    return frozenset(_WORD_RE.findall(definition.lower()))
+
+def guess_pos(word, definition=''):
+    """Rough part of speech from the definition's opening and the word's suffix."""
+    definition = definition.strip().lower()
+    if definition.startswith('to '):
+        return 'verb'
+    if definition.startswith(('a ', 'an ', 'the ', 'one who ', 'someone ', 'something ')):
+        return 'noun'
+    word = word.lower()
+    if word.endswith('ly'):
+        return 'adv'
+    if word.endswith(('tion', 'sion', 'ment', 'ness', 'ity', 'ism', 'ance', 'ence', 'dote', 'ice')):
+        return 'noun'
+    if word.endswith(('ate', 'ise', 'ize', 'ify', 'en')):
+        return 'verb'
+    return 'adj'
+
+class LocalOptionEngine:
+    def __init__(self, path=DEFINITIONS_PATH):
+        self._lock = threading.Lock()
+        self._definitions = {}  # word -> (pos, definition, word set of the definition)
+        self._buckets = {}      # pos -> (sorted lengths, matching words)
+        self._load_lock = threading.Lock()
+        self.loaded = False     # whether stored option sets have been added
+        try:
+            with open(path) as f:
+                for word, (pos, definition) in json.load(f).items():
+                    self._definitions[word] = (pos, definition, _tokens(definition))
+        except Exception as e:
+            print(f"Warning: Could not load {path}: {e}")
+        self._reindex()
+
+    def _reindex(self):
+        entries = {}
+        for word, (pos, definition, _) in self._definitions.items():
+            entries.setdefault(pos, []).append((len(definition), word))
+        self._buckets = {}
+        for pos, items in entries.items():
+            items.sort()
+            self._buckets[pos] = ([n for n, _ in items], [w for _, w in items])
+
+    def _insert(self, word, pos, definition):
+        lengths, words = self._buckets.setdefault(pos, ([], []))
+        i = bisect_right(lengths, len(definition))
+        lengths.insert(i, len(definition))
+        words.insert(i, word)
+
+    def _remove(self, word, pos, definition):
+        lengths, words = self._buckets[pos]
+        i = bisect_left(lengths, len(definition))
+        while words[i] != word:
+            i += 1
+        del lengths[i], words[i]
+
+    def learn(self, word, definition):
+        """Add or replace a word's correct definition, e.g. from a generated option set."""
+        word = word.strip().lower()
+        if not word or not definition:
+            return
+        with self._lock:
+            old = self._definitions.get(word)
+            pos = old[0] if old else guess_pos(word, definition)
+            self._definitions[word] = (pos, definition, _tokens(definition))
+            if old:
+                self._remove(word, pos, old[1])
+            self._insert(word, pos, definition)
+
+    def learn_many(self, definitions):
+        for word, definition in definitions:
+            self.learn(word, definition)
+
+    def load_stored(self):
+        """Add the correct option of every stored option set, once.
+
+        This reads the whole quiz_option_sets table, so it runs on a worker
+        thread: from the warmer at startup, or the first fallback before that.
+        """
+        with self._load_lock:
+            if self.loaded:
+                return
+            try:
+                stored = list(get_stored_definitions())
+            except Exception as e:
+                print(f"Error loading stored definitions: {e}")
+                stored = []
+            with self._lock:
+                for word, definition in stored:
+                    word = word.strip().lower()
+                    # Bundled definitions are hand checked, so they win
+                    if word and definition and word not in self._definitions:
+                        self._definitions[word] = (guess_pos(word, definition), definition, _tokens(definition))
+                self._reindex()
+            # Set even after an error, so an outage does not rescan the table on every fallback
+            self.loaded = True
+
+    def _score(self, word, correct, correct_tokens, candidate_word, candidate, candidate_tokens):
+        score = -abs(len(candidate) - len(correct)) / max(len(correct), 1)
+        if candidate_word[-3:] == word[-3:]:
+            score += 0.3
+        # Definitions that share most of their words with the correct one are too close
+        a, b = correct_tokens, candidate_tokens
+        if a and b and len(a & b) / len(a | b) > 0.5:
+            score -= 5
+        return score
+
+    def options(self, word, rng=random):
+        """Correct option first, or None if the word has no known definition.
+
+        Loads stored definitions first if that has not happened yet, so call it
+        from a worker thread until loaded is set.
+        """
+        if not self.loaded:
+            self.load_stored()
+        word = word.strip().lower()
+        entry = self._definitions.get(word)
+        if entry is None:
+            return None
+        pos, correct, correct_tokens = entry
+
+        candidates = []
+        for bucket_pos in (pos, *[p for p in self._buckets if p != pos]):
+            lengths, words = self._buckets[bucket_pos]
+            i = bisect_left(lengths, len(correct))
+            for other in words[max(0, i - _WINDOW):i + _WINDOW]:
+                _, definition, tokens = self._definitions[other]
+                if other != word and definition.lower() != correct.lower():
+                    score = self._score(word, correct, correct_tokens, other, definition, tokens)
+                    candidates.append((score, definition))
+            # Other parts of speech are only needed if this one is too small
+            if len(candidates) >= 4:
+                break
+        if len(candidates) < 2:
+            return None
+
+        # Pick from the best few so repeat questions do not always look the same
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        distractors = rng.sample([c[1] for c in candidates[:4]], 2)
+        return [correct, *distractors]
+
+engine = LocalOptionEngine()
+
+def local_quiz_options(word):
+    return engine.options(word)
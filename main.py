@@ -1,660 +1,194 @@
 from fasthtml.common import *
 try:
-    from database import add_word, remove_word, get_all_words, get_active_words
+    from database import (add_word, add_words, remove_word, cached_active_words,
+                          cached_word_list_version, count_words, get_previous_word_id, get_words_page, pool_stats)
     print("Database imported successfully")
 except Exception as e:
     print(f"Warning: Database import failed: {e}")
     # Create fallback functions
     def add_word(word): return False
+    def add_words(words): return []
+    def count_words(): return 0
+    def get_previous_word_id(word, query='', match='prefix'): return None
+    def get_words_page(after=None, after_id=0, query='', limit=100, match='prefix'): return []
+    def pool_stats(): return None
     def remove_word(word_id): return False
-    def get_all_words(): return []
-    def get_active_words(): return []
-from anthropic import Anthropic
+    def cached_active_words(): return ()
+    def cached_word_list_version(): return None
+from quiz_options import (get_quiz_options, stream_quiz_options, prefetch_options, option_cache, cache_key,
+                          llm_breaker, batch_breaker)
+from warmer import warmer
+from quiz_session import (load_state, save_state, new_state, start_round, restart_round,
+                          current_word, upcoming_words, session_id)
+from scheduler import order_round, record_answer
+from assets import AssetMiddleware, asset_headers, stylesheet
+from http_cache import HttpCacheMiddleware, build_id
+import metrics
+from metrics import MetricsMiddleware
 import os
 import json
+import asyncio
+import re
+import csv
+import io
 import random
+import secrets
+import time
+from urllib.parse import urlencode, quote
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Initialize Anthropic client
-try:
-    anthropic = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
-except Exception as e:
-    print(f"Warning: Could not initialize Anthropic client: {e}")
-    anthropic = None
+# Pages that can be revalidated with If-None-Match, and what their content depends on
+cache_validators = {
+    '/': lambda: 'static',
+    '/import': lambda: 'static',
+    '/config': cached_word_list_version,
+    '/config/words': cached_word_list_version
+}
 
-# FastHTML app setup with mobile-optimized styling
+async def warm_on_first_request(req):
+    # Async so the usual call is a flag check on the loop rather than a threadpool hop
+    warmer.start()
+
+# FastHTML app setup; the mobile-optimized styling lives in static/app.css
 app, rt = fast_app(
-    hdrs=(
-        Link(rel='stylesheet', href='https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap'),
-        Style('''
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            
-            body {
-                font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                background: #ffffff;
-                color: #37352f;
-                line-height: 1.5;
-                min-height: 100vh;
-                transition: background-color 0.3s ease, color 0.3s ease;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                body {
-                    background: #1a1a1a;
-                    color: #e5e5e5;
-                }
-            }
-            
-            .container {
-                max-width: 800px;
-                margin: 0 auto;
-                padding: 1rem;
-            }
-            
-            .header {
-                text-align: center;
-                margin-bottom: 1.5rem;
-                padding: 1rem 0;
-            }
-            
-            h1 {
-                font-size: 2rem;
-                font-weight: 700;
-                margin-bottom: 0.25rem;
-                color: #37352f;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                h1 {
-                    color: #ffffff;
-                }
-            }
-            
-            @media (max-width: 768px) {
-                h1 {
-                    font-size: 1.75rem;
-                }
-            }
-            
-            .subtitle {
-                color: #57534e;
-                font-size: 1.125rem;
-            }
-            
-            .nav {
-                display: flex;
-                gap: 1rem;
-                justify-content: center;
-                margin: 1rem 0;
-                border-bottom: 1px solid #e9e9e7;
-                padding-bottom: 0.75rem;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .nav {
-                    border-bottom-color: #404040;
-                }
-            }
-            
-            .nav-link {
-                padding: 0.5rem 1rem;
-                text-decoration: none;
-                color: #37352f;
-                font-weight: 500;
-                border-radius: 6px;
-                transition: all 0.2s;
-            }
-            
-            .nav-link:hover {
-                background: #f4f4f2;
-            }
-            
-            .nav-link.active {
-                background: #37352f;
-                color: white;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .nav-link {
-                    color: #e5e5e5;
-                }
-                
-                .nav-link:hover {
-                    background: #2a2a2a;
-                }
-                
-                .nav-link.active {
-                    background: #e5e5e5;
-                    color: #1a1a1a;
-                }
-            }
-            
-            .card {
-                background: #ffffff;
-                border: 1px solid #e9e9e7;
-                border-radius: 8px;
-                padding: 1.5rem;
-                margin-bottom: 1rem;
-                box-shadow: 0 1px 3px rgba(0, 0, 0, 0.04);
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .card {
-                    background: #2a2a2a;
-                    border-color: #404040;
-                    box-shadow: 0 1px 3px rgba(255, 255, 255, 0.05);
-                }
-            }
-            
-            @media (max-width: 768px) {
-                .card {
-                    padding: 1rem;
-                }
-            }
-            
-            .word-list {
-                display: flex;
-                flex-direction: column;
-                gap: 0.5rem;
-                margin: 1.5rem 0;
-                max-height: 400px;
-                overflow-y: auto;
-                padding-right: 0.5rem;
-            }
-            
-            .word-list::-webkit-scrollbar {
-                width: 6px;
-            }
-            
-            .word-list::-webkit-scrollbar-track {
-                background: #f4f4f2;
-                border-radius: 3px;
-            }
-            
-            .word-list::-webkit-scrollbar-thumb {
-                background: #d4d4d2;
-                border-radius: 3px;
-            }
-            
-            .word-list::-webkit-scrollbar-thumb:hover {
-                background: #c4c4c2;
-            }
-            
-            .word-tile {
-                display: flex;
-                align-items: center;
-                justify-content: space-between;
-                padding: 0.875rem 1.25rem;
-                background: #f9f9f8;
-                border: 1px solid #e9e9e7;
-                border-radius: 8px;
-                font-size: 1rem;
-                transition: all 0.2s;
-            }
-            
-            .word-tile:hover {
-                background: #f4f4f2;
-                border-color: #d9d9d7;
-                transform: translateX(2px);
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .word-tile {
-                    background: #333333;
-                    border-color: #404040;
-                    color: #e5e5e5;
-                }
-                
-                .word-tile:hover {
-                    background: #3a3a3a;
-                    border-color: #505050;
-                }
-            }
-            
-            .remove-btn {
-                background: none;
-                border: none;
-                color: #eb5757;
-                cursor: pointer;
-                font-size: 1.25rem;
-                line-height: 1;
-                padding: 0;
-                margin-left: 0.25rem;
-            }
-            
-            .form-group {
-                margin-bottom: 1.5rem;
-            }
-            
-            .input-group {
-                display: flex;
-                gap: 0.75rem;
-            }
-            
-            input[type="text"] {
-                flex: 1;
-                padding: 0.75rem 1rem;
-                border: 1px solid #e9e9e7;
-                border-radius: 6px;
-                font-size: 1rem;
-                font-family: inherit;
-                transition: border-color 0.2s;
-                background: #ffffff;
-                color: #37352f;
-            }
-            
-            input[type="text"]:focus {
-                outline: none;
-                border-color: #37352f;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                input[type="text"] {
-                    background: #333333;
-                    border-color: #404040;
-                    color: #e5e5e5;
-                }
-                
-                input[type="text"]:focus {
-                    border-color: #e5e5e5;
-                }
-            }
-            
-            .btn {
-                padding: 0.75rem 1.5rem;
-                background: #37352f;
-                color: white;
-                border: none;
-                border-radius: 6px;
-                font-size: 1rem;
-                font-weight: 500;
-                cursor: pointer;
-                transition: all 0.2s;
-                font-family: inherit;
-            }
-            
-            .btn:hover {
-                background: #2f2f2f;
-                transform: translateY(-1px);
-            }
-            
-            .btn-secondary {
-                background: #f4f4f2;
-                color: #37352f;
-            }
-            
-            .btn-secondary:hover {
-                background: #e9e9e7;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .btn {
-                    background: #e5e5e5;
-                    color: #1a1a1a;
-                }
-                
-                .btn:hover {
-                    background: #d5d5d5;
-                }
-                
-                .btn-secondary {
-                    background: #333333;
-                    color: #e5e5e5;
-                }
-                
-                .btn-secondary:hover {
-                    background: #404040;
-                }
-            }
-            
-            .quiz-card {
-                text-align: center;
-                padding: 2rem 1.5rem;
-            }
-            
-            @media (max-width: 768px) {
-                .quiz-card {
-                    padding: 1.5rem 1rem;
-                }
-            }
-            
-            .quiz-word {
-                font-size: 2rem;
-                font-weight: 700;
-                margin-bottom: 1.5rem;
-                color: #37352f;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .quiz-word {
-                    color: #ffffff;
-                }
-            }
-            
-            @media (max-width: 768px) {
-                .quiz-word {
-                    font-size: 1.75rem;
-                    margin-bottom: 1rem;
-                }
-            }
-            
-            .quiz-options {
-                display: flex;
-                flex-direction: column;
-                gap: 0.75rem;
-                margin-bottom: 1.5rem;
-            }
-            
-            @media (max-width: 768px) {
-                .quiz-options {
-                    gap: 0.5rem;
-                    margin-bottom: 1rem;
-                }
-            }
-            
-            form.quiz-options {
-                display: flex;
-                flex-direction: column;
-                gap: 1rem;
-                margin-bottom: 2rem;
-            }
-            
-            .option-btn {
-                width: 100%;
-                padding: 1rem;
-                text-align: left;
-                background: #f4f4f2;
-                border: 2px solid transparent;
-                border-radius: 8px;
-                font-size: 1rem;
-                color: #1a1a1a;
-                font-weight: 500;
-                cursor: pointer;
-                transition: all 0.2s;
-                line-height: 1.4;
-            }
-            
-            .option-btn:hover {
-                background: #e9e9e7;
-                border-color: #37352f;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .option-btn {
-                    background: #333333;
-                    color: #e5e5e5;
-                    border-color: transparent;
-                }
-                
-                .option-btn:hover {
-                    background: #404040;
-                    border-color: #e5e5e5;
-                }
-            }
-            
-            @media (max-width: 768px) {
-                .option-btn {
-                    padding: 0.875rem;
-                    font-size: 0.9rem;
-                }
-            }
-            
-            .option-btn:hover {
-                background: #e9e9e7;
-                border-color: #37352f;
-            }
-            
-            .option-btn.correct {
-                background: #d1f4e0;
-                border-color: #27ae60;
-            }
-            
-            .option-btn.incorrect {
-                background: #ffe0e0;
-                border-color: #eb5757;
-            }
-            
-            .stats {
-                display: flex;
-                justify-content: center;
-                gap: 2rem;
-                margin: 1rem 0;
-            }
-            
-            @media (max-width: 768px) {
-                .stats {
-                    gap: 1.5rem;
-                    margin: 0.75rem 0;
-                }
-            }
-            
-            .stat {
-                text-align: center;
-            }
-            
-            .stat-value {
-                font-size: 1.75rem;
-                font-weight: 700;
-                color: #37352f;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .stat-value {
-                    color: #ffffff;
-                }
-            }
-            
-            @media (max-width: 768px) {
-                .stat-value {
-                    font-size: 1.5rem;
-                }
-            }
-            
-            .stat-label {
-                color: #57534e;
-                font-size: 0.875rem;
-                font-weight: 500;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .stat-label {
-                    color: #b5b5b5;
-                }
-            }
-            
-            .message {
-                padding: 1rem;
-                border-radius: 6px;
-                margin: 1rem 0;
-                text-align: center;
-            }
-            
-            .message.success {
-                background: #d1f4e0;
-                color: #27ae60;
-            }
-            
-            .message.error {
-                background: #ffe0e0;
-                color: #eb5757;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .message.success {
-                    background: #1a4d2e;
-                    color: #4ade80;
-                }
-                
-                .message.error {
-                    background: #4d1a1a;
-                    color: #f87171;
-                }
-            }
-            
-            .congrats {
-                text-align: center;
-                padding: 2rem;
-            }
-            
-            @media (max-width: 768px) {
-                .congrats {
-                    padding: 1.5rem;
-                }
-            }
-            
-            .congrats h2 {
-                font-size: 2rem;
-                margin-bottom: 0.75rem;
-                color: #1a1a1a;
-            }
-            
-            .congrats p {
-                color: #1a1a1a;
-                font-weight: 500;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .congrats h2 {
-                    color: #ffffff;
-                }
-                
-                .congrats p {
-                    color: #e5e5e5;
-                }
-            }
-            
-            @media (max-width: 768px) {
-                .congrats h2 {
-                    font-size: 1.75rem;
-                    margin-bottom: 0.5rem;
-                }
-            }
-            
-            .loading {
-                display: flex;
-                justify-content: center;
-                padding: 2rem;
-                color: #57534e;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .loading {
-                    color: #b5b5b5;
-                }
-            }
-            
-            .welcome-title {
-                text-align: center;
-                margin: 2rem 0 1.5rem 0;
-                color: #1a1a1a;
-            }
-            
-            .welcome-subtitle {
-                text-align: center;
-                color: #57534e;
-                font-size: 1.125rem;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .welcome-title {
-                    color: #ffffff;
-                }
-                
-                .welcome-subtitle {
-                    color: #b5b5b5;
-                }
-            }
-            
-            .page-title {
-                color: #1a1a1a;
-            }
-            
-            @media (prefers-color-scheme: dark) {
-                .page-title {
-                    color: #ffffff;
-                }
-            }
-        ''')
-    )
+    hdrs=asset_headers(),
+    middleware=[Middleware(MetricsMiddleware), Middleware(AssetMiddleware),
+                Middleware(HttpCacheMiddleware, validators=cache_validators,
+                           build=build_id(__file__) + stylesheet.digest)],
+    # Pre-generate options for any words that do not have them yet, from the first request
+    before=[warm_on_first_request],
+    on_shutdown=[warmer.shutdown]
 )
 
-# Session state
-quiz_state = {
-    'words_remaining': [],
-    'current_word': None,
-    'streak': 0,
-    'correct_answers': 0,
-    'total_words': 0
-}
+# Upcoming questions whose options are loaded while the student answers
+PREFETCH_AHEAD = 2
+# Show the word straight away and stream in options that are not already cached
+STREAM_QUESTIONS = os.getenv('QUIZ_STREAMING', '1') != '0'
+
+def reset_quiz(session, state):
+    words = [word for _, word in cached_active_words()]
+    start_round(state, order_round(session_id(session), words))
 
-def reset_quiz():
-    words = get_active_words()
-    quiz_state['words_remaining'] = [w.word for w in words]
-    quiz_state['streak'] = 0
-    quiz_state['correct_answers'] = 0
-    quiz_state['total_words'] = len(words)
-    quiz_state['current_word'] = None
-
-def get_quiz_options(word):
-    """Get multiple choice options from Claude API"""
-    if anthropic is None:
-        return [
-            f"The correct definition of {word}",
-            f"An incorrect definition of {word} (option 1)",
-            f"An incorrect definition of {word} (option 2)"
-        ]
+def question_card(quiz_state, word, options):
+    """Render a question and remember it in the quiz state for the answer handler."""
+    # Shuffle options but remember correct answer position
+    shuffled_options = list(options)
+    random.shuffle(shuffled_options)
+    question_id = secrets.token_hex(4)
+    quiz_state['question'] = [question_id, word, shuffled_options, shuffled_options.index(options[0]),
+                              int(time.time() * 1000)]
     
-    try:
-        message = anthropic.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1000,
-            temperature=0.7,
-            system="You are a vocabulary tutor helping students prepare for the 11+ exam. Generate challenging but fair multiple choice options.",
-            messages=[{
-                "role": "user",
-                "content": f"""Generate 3 different definitions or uses for the word "{word}" for a multiple choice quiz.
-                
-                The first one must be the CORRECT definition/use.
-                The other two should be plausible but incorrect alternatives that would make the quiz reasonably challenging.
-                
-                Return your response as a JSON object with this exact structure:
-                {{
-                    "options": [
-                        "correct definition or use",
-                        "plausible but incorrect option 1",
-                        "plausible but incorrect option 2"
-                    ]
-                }}
-                
-                Make sure the options are of similar length and complexity."""
-            }]
-        )
-        
-        # Parse the response
-        content = message.content[0].text
-        # Extract JSON from the response
-        import re
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        if json_match:
-            data = json.loads(json_match.group())
-            return data['options']
-        else:
-            # Fallback options
-            return [
-                f"The correct definition of {word}",
-                f"An incorrect definition of {word} (option 1)",
-                f"An incorrect definition of {word} (option 2)"
-            ]
-    except Exception as e:
-        print(f"Error getting options from Claude: {e}")
-        # Fallback options
-        return [
-            f"The correct definition of {word}",
-            f"An incorrect definition of {word} (option 1)", 
-            f"An incorrect definition of {word} (option 2)"
-        ]
+    return Div(
+        Div(word, cls='quiz-word'),
+        Div(
+            *[Button(
+                option,
+                cls='option-btn',
+                hx_get=f'/quiz/answer/{question_id}/{i}',
+                hx_target='#quiz-content'
+            ) for i, option in enumerate(shuffled_options)],
+            cls='quiz-options'
+        ),
+        cls='card quiz-card'
+    )
+
+STREAM_SCRIPT = '''(function() {
+    var card = document.getElementById('question-%(id)s');
+    var buttons = card.querySelectorAll('.option-btn');
+    var source = new EventSource('/quiz/stream/%(id)s');
+    source.addEventListener('option', function(e) {
+        var data = JSON.parse(e.data);
+        buttons[data.i].textContent = data.text;
+    });
+    source.addEventListener('done', function(e) {
+        source.close();
+        JSON.parse(e.data).forEach(function(text, i) {
+            buttons[i].textContent = text;
+            buttons[i].disabled = false;
+        });
+    });
+    source.onerror = function() {
+        // Fall back to loading the whole question in one request
+        source.close();
+        htmx.ajax('GET', %(fallback)s, {target: card, swap: 'outerHTML'});
+    };
+})();'''
+
+def streaming_question_card(quiz_state, word):
+    """Render the word now, with disabled buttons filled in from /quiz/stream.
+
+    The correct option's position is chosen here and the model is asked to
+    write it there, so the order the options arrive in gives nothing away.
+    Which option is correct comes from the model's own label, and the final
+    list moves it to this position if the model wrote it elsewhere.
+    """
+    question_id = secrets.token_hex(4)
+    # Options and shown-at time are filled in when the stream completes
+    quiz_state['question'] = [question_id, word, None, random.randrange(3), None]
+
+    return Div(
+        Div(word, cls='quiz-word'),
+        Div(
+            *[Button(
+                '…',
+                cls='option-btn',
+                disabled=True,
+                hx_get=f'/quiz/answer/{question_id}/{i}',
+                hx_target='#quiz-content'
+            ) for i in range(3)],
+            cls='quiz-options'
+        ),
+        Script(STREAM_SCRIPT % {'id': question_id, 'fallback': json.dumps(f'/quiz/question/{quote(word)}')}),
+        cls='card quiz-card',
+        id=f'question-{question_id}'
+    )
+
+def word_tile(word_id, word):
+    return Div(
+        Span(word),
+        Button('×', cls='remove-btn',
+               hx_delete=f'/remove-word/{word_id}',
+               hx_target='closest .word-tile',
+               hx_swap='outerHTML'),
+        cls='word-tile',
+        id=f'word-{word_id}'
+    )
+
+WORDS_PAGE_SIZE = 100
+
+def matches_search(word, query, match='prefix'):
+    """Whether a word is shown for a search, the same way get_words_page filters."""
+    return query in word if match == 'contains' else word.startswith(query)
+
+def word_list_page(query='', after=None, after_id=0, match='prefix'):
+    """Tiles for one page of the word list and the cursor of its last word.
+
+    A full page ends with a placeholder that loads the next page when it
+    scrolls into view. The cursor is empty once the list is fully loaded.
+    """
+    words = get_words_page(after, after_id, query, WORDS_PAGE_SIZE, match)
+    tiles = [word_tile(word.id, word.word) for word in words]
+    if len(words) < WORDS_PAGE_SIZE:
+        return tiles, ''
+    last = words[-1]
+    params = urlencode({'q': query, 'match': match, 'after': last.word.lower(), 'after_id': last.id})
+    tiles.append(Div(
+        Div('Loading more...', cls='loading'),
+        hx_get=f'/config/words?{params}',
+        hx_trigger='intersect once',
+        hx_swap='outerHTML'
+    ))
+    return tiles, last.word.lower()
+
+def word_list_cursor(cursor, oob=False):
+    return Input(type='hidden', id='word-list-cursor', name='cursor', value=cursor,
+                 hx_swap_oob='true' if oob else None)
+
+def word_count(total, oob=False):
+    return P(f'Total words: {total}', style='color: #57534e; text-align: center; font-weight: 500;',
+             id='word-count', hx_swap_oob='true' if oob else None)
 
 @rt('/')
 def home():
@@ -685,10 +219,11 @@ def test():
 @rt('/config')
 def config():
     try:
-        words = sorted(get_all_words(), key=lambda w: w.word.lower())
+        tiles, cursor = word_list_page()
+        total = count_words()
     except Exception as e:
         print(f"Database error in config: {e}")
-        words = []
+        tiles, cursor, total = [], '', 0
     
     return Div(
         Div(
@@ -709,101 +244,207 @@ def config():
                         Input(type='text', id='new-word', placeholder='Enter a new word...', 
                               hx_trigger='keyup[key=="Enter"]',
                               hx_post='/add-word',
-                              hx_target='#word-list',
-                              hx_include='#new-word'),
+                              hx_swap='none',
+                              hx_include='#new-word, #word-search, #word-search-anywhere, #word-list-cursor',
+                              hx_on__after_request="this.value = ''"),
                         Button('Add Word', cls='btn',
                                hx_post='/add-word',
-                               hx_target='#word-list',
-                               hx_include='#new-word'),
+                               hx_swap='none',
+                               hx_include='#new-word, #word-search, #word-search-anywhere, #word-list-cursor',
+                               hx_on__after_request="document.getElementById('new-word').value = ''"),
                         cls='input-group'
                     ),
                     cls='form-group'
                 ),
+                Input(type='search', id='word-search', name='q', placeholder='Search words...',
+                      hx_get='/config/words',
+                      hx_trigger='input changed delay:300ms, search',
+                      hx_include='#word-search-anywhere',
+                      hx_target='#word-list'),
+                # Searches match the start of words unless this is ticked, which is slower
+                Label(Input(type='checkbox', id='word-search-anywhere', name='match', value='contains',
+                            hx_get='/config/words',
+                            hx_trigger='change',
+                            hx_include='#word-search',
+                            hx_target='#word-list'),
+                      ' Match anywhere in the word', style='font-size: 0.9rem; color: #57534e;'),
                 Div(
-                    *[Div(
-                        Span(word.word),
-                        Button('×', cls='remove-btn',
-                               hx_delete=f'/remove-word/{word.id}',
-                               hx_target='#word-list'),
-                        cls='word-tile'
-                    ) for word in words],
+                    *tiles,
                     id='word-list',
                     cls='word-list'
                 ),
-                P(f'Total words: {len(words)}', style='color: #57534e; text-align: center; font-weight: 500;', id='word-count'),
+                word_list_cursor(cursor),
+                word_count(total),
+                P(A('Import a word list', href='/import'), style='text-align: center; margin-top: 0.5rem;'),
                 cls='card'
             ),
             cls='container'
         )
     )
 
+@rt('/config/words')
+def get(q: str = '', after: str = None, after_id: int = 0, match: str = 'prefix'):
+    """The next page of the word list, or the first page of a search."""
+    try:
+        tiles, cursor = word_list_page(q.strip(), after, after_id, match)
+    except Exception as e:
+        print(f"Database error in word list: {e}")
+        tiles, cursor = [], ''
+    return *tiles, word_list_cursor(cursor, oob=True)
+
+def add_word_tile(new_word, cursor, query, match):
+    """Add a word and return (its id, the tile to insert or None, the new total).
+
+    Only the new tile is sent, swapped in after the word that sorts before it,
+    and only if the page has loaded that far and its search would show it.
+    """
+    word_id = add_word(new_word) if new_word else False
+    tile = None
+    if word_id and (not cursor or new_word < cursor) and matches_search(new_word, query, match):
+        previous_id = get_previous_word_id(new_word, query, match)
+        # For positional out-of-band swaps htmx inserts the wrapper's children
+        tile = Div(word_tile(word_id, new_word),
+                   hx_swap_oob=f'afterend:#word-{previous_id}' if previous_id else 'afterbegin:#word-list')
+    return word_id, tile, count_words()
+
 @rt('/add-word', methods=['POST'])
 async def post(request):
     form = await request.form()
     new_word = form.get('new-word', '').strip().lower()
+    # Last loaded word and search filter of the page, to skip tiles it is not showing
+    cursor = form.get('cursor', '')
+    query = form.get('q', '').strip().lower()
+    match = form.get('match', 'prefix')
     
     try:
-        if new_word:
-            add_word(new_word)
-        words = sorted(get_all_words(), key=lambda w: w.word.lower())
+        word_id, tile, total = await asyncio.to_thread(add_word_tile, new_word, cursor, query, match)
     except Exception as e:
         print(f"Database error in add-word: {e}")
-        words = []
+        return ''
+    if word_id:
+        warmer.warm([new_word])
+    return tile or '', word_count(total, oob=True)
+
+# Letters with inner spaces, hyphens or apostrophes, up to 50 characters
+WORD_PATTERN = re.compile(r"[a-z][a-z' -]{0,48}[a-z]|[a-z]")
+
+def parse_words(text, filename=''):
+    """Normalize pasted text or an uploaded file into unique words, in order.
+
+    Returns (words, rejected) where rejected counts entries that are not words.
+    """
+    if filename.lower().endswith('.csv'):
+        # One word per row, taken from the first non-empty column
+        entries = [next((cell for cell in row if cell.strip()), '') for row in csv.reader(io.StringIO(text))]
+    else:
+        entries = re.split(r'[\n,;\t]+', text)
+    words, seen, rejected = [], set(), 0
+    for entry in entries:
+        word = entry.strip().strip('"\'').lower()
+        if not word or word in ('word', 'words'):
+            continue
+        if not WORD_PATTERN.fullmatch(word):
+            rejected += 1
+        elif word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words, rejected
+
+@rt('/import')
+def get():
     return Div(
-        *[Div(
-            Span(word.word),
-            Button('×', cls='remove-btn',
-                   hx_delete=f'/remove-word/{word.id}',
-                   hx_target='#word-list'),
-            cls='word-tile'
-        ) for word in words],
-        id='word-list',
-        cls='word-list'
-    ), P(f'Total words: {len(words)}', style='color: #57534e; text-align: center; font-weight: 500;', id='word-count', hx_swap_oob='true'), Script('document.getElementById("new-word").value = "";')
+        Div(
+            H1("Ronin's Vocab"),
+            P("11+ Exam Vocabulary Practice Tool", cls='subtitle'),
+            cls='header'
+        ),
+        Div(
+            A('Quiz', href='/quiz', cls='nav-link'),
+            A('Words', href='/config', cls='nav-link active'),
+            cls='nav'
+        ),
+        Div(
+            Div(
+                H2('Import Words', cls='page-title'),
+                Form(
+                    Div(
+                        Textarea(name='words', placeholder='Paste words, one per line or separated by commas...'),
+                        cls='form-group'
+                    ),
+                    Div(
+                        P('Or upload a .txt or .csv file:', style='margin-bottom: 0.5rem;'),
+                        Input(type='file', name='file', accept='.txt,.csv,text/plain,text/csv'),
+                        cls='form-group'
+                    ),
+                    Button('Import', cls='btn', type='submit'),
+                    hx_post='/import',
+                    hx_target='#import-result',
+                    hx_encoding='multipart/form-data'
+                ),
+                Div(id='import-result', style='margin-top: 1rem;'),
+                cls='card'
+            ),
+            cls='container'
+        )
+    )
+
+@rt('/import', methods=['POST'])
+async def post(request):
+    form = await request.form()
+    words, rejected = parse_words(form.get('words', '') or '')
+    upload = form.get('file')
+    if upload is not None and getattr(upload, 'filename', ''):
+        # Parsed on its own, so pasted text is never read as CSV
+        text = (await upload.read()).decode('utf-8-sig', errors='replace')
+        file_words, file_rejected = parse_words(text, upload.filename)
+        pasted = set(words)
+        words += [word for word in file_words if word not in pasted]
+        rejected += file_rejected
+    try:
+        inserted = await asyncio.to_thread(add_words, words)
+    except Exception as e:
+        print(f"Database error in import: {e}")
+        return Div(P('Import failed, please try again.'), cls='message error')
+    if inserted:
+        warmer.warm(inserted)
+    
+    details = [P(f'Added: {len(inserted)}', style='font-weight: bold;'),
+               P(f'Already in your list: {len(words) - len(inserted)}')]
+    if rejected:
+        details.append(P(f'Skipped (not words): {rejected}'))
+    return Div(*details, cls='message success')
 
 @rt('/remove-word/{word_id}', methods=['DELETE'])
 def delete(word_id: int):
     try:
         remove_word(word_id)
-        words = sorted(get_all_words(), key=lambda w: w.word.lower())
+        total = count_words()
     except Exception as e:
         print(f"Database error in remove-word: {e}")
-        words = []
+        return ''
     
-    return Div(
-        Div(
-            *[Div(
-                Span(word.word),
-                Button('×', cls='remove-btn',
-                       hx_delete=f'/remove-word/{word.id}',
-                       hx_target='#word-list'),
-                cls='word-tile'
-            ) for word in words],
-            id='word-list',
-            cls='word-list'
-        ),
-        P(f'Total words: {len(words)}', style='color: #57534e; text-align: center; font-weight: 500;', id='word-count', hx_swap_oob='true')
-    )
+    # The empty main response removes the tile; only the count is updated
+    return word_count(total, oob=True)
 
 @rt('/quiz')
-def quiz():
+async def quiz(session):
     # Always reset quiz when navigating to quiz page to ensure word count is accurate
+    quiz_state = new_state()
     try:
-        reset_quiz()
+        await asyncio.to_thread(reset_quiz, session, quiz_state)
     except Exception as e:
         print(f"Database error in quiz reset: {e}")
         # Use fallback words for demo
-        quiz_state['words_remaining'] = ['example', 'vocabulary', 'word']
-        quiz_state['streak'] = 0
-        quiz_state['correct_answers'] = 0
-        quiz_state['total_words'] = 3
+        start_round(quiz_state, ['example', 'vocabulary', 'word'])
     
     # Get the first question directly
-    if not quiz_state['words_remaining']:
+    word = current_word(quiz_state)
+    if word is None:
+        await asyncio.to_thread(save_state, session, quiz_state)
         quiz_content = Div(
             Div(
                 H2('🎉 Congratulations!'),
-                P(f'You completed all {quiz_state["total_words"]} words!'),
+                P(f'You completed all {len(quiz_state["deck"])} words!'),
                 P(f'Final streak: {quiz_state["streak"]}'),
                 Button('Start Again', cls='btn', onclick='window.location.href="/quiz"'),
                 cls='congrats'
@@ -811,28 +452,14 @@ def quiz():
             cls='card quiz-card'
         )
     else:
-        # Pick a random word and get quiz content
-        word = random.choice(quiz_state['words_remaining'])
-        quiz_state['current_word'] = word
-        options = get_quiz_options(word)
-        correct_answer = options[0]
-        shuffled_options = options.copy()
-        random.shuffle(shuffled_options)
-        correct_index = shuffled_options.index(correct_answer)
-        
-        quiz_content = Div(
-            Div(word, cls='quiz-word'),
-            Div(
-                *[Button(
-                    option,
-                    cls='option-btn',
-                    hx_get=f'/quiz/answer/{word}/{i}/{correct_index}',
-                    hx_target='#quiz-content'
-                ) for i, option in enumerate(shuffled_options)],
-                cls='quiz-options'
-            ),
-            cls='card quiz-card'
-        )
+        prefetch_options(upcoming_words(quiz_state, PREFETCH_AHEAD))
+        options = option_cache.get(cache_key(word))
+        if options is None and STREAM_QUESTIONS:
+            quiz_content = streaming_question_card(quiz_state, word)
+        else:
+            options = options or await get_quiz_options(word)
+            quiz_content = question_card(quiz_state, word, options)
+        await asyncio.to_thread(save_state, session, quiz_state)
     
     return Div(
         Div(
@@ -853,7 +480,7 @@ def quiz():
                     cls='stat'
                 ),
                 Div(
-                    Div(f'{quiz_state["total_words"] - len(quiz_state["words_remaining"])}/{quiz_state["total_words"]}', cls='stat-value'),
+                    Div(f'{quiz_state["position"]}/{len(quiz_state["deck"])}', cls='stat-value'),
                     Div('This Round', cls='stat-label'),
                     cls='stat'
                 ),
@@ -866,12 +493,14 @@ def quiz():
     )
 
 @rt('/quiz/next')
-def quiz_next():
-    if not quiz_state['words_remaining']:
+async def quiz_next(session):
+    quiz_state = await asyncio.to_thread(load_state, session)
+    word = current_word(quiz_state)
+    if word is None:
         return Div(
             Div(
                 H2('🎉 Congratulations!'),
-                P(f'You completed all {quiz_state["total_words"]} words!'),
+                P(f'You completed all {len(quiz_state["deck"])} words!'),
                 P(f'Final streak: {quiz_state["streak"]}'),
                 Button('Start Again', cls='btn', onclick='window.location.href="/quiz"'),
                 cls='congrats'
@@ -879,10 +508,17 @@ def quiz_next():
             cls='card quiz-card'
         )
     
-    # Pick a random word
-    word = random.choice(quiz_state['words_remaining'])
-    quiz_state['current_word'] = word
-    
+    # Prefetched options are rendered right away; anything else is streamed in
+    options = option_cache.get(cache_key(word))
+    if options is not None or STREAM_QUESTIONS:
+        if options is not None:
+            card = question_card(quiz_state, word, options)
+            prefetch_options(upcoming_words(quiz_state, PREFETCH_AHEAD))
+        else:
+            card = streaming_question_card(quiz_state, word)
+        await asyncio.to_thread(save_state, session, quiz_state)
+        return card
+
     return Div(
         Div('Loading question...', cls='loading'),
         cls='card quiz-card',
@@ -892,28 +528,40 @@ def quiz_next():
     )
 
 @rt('/quiz/question/{word}')
-def quiz_question(word: str):
-    options = get_quiz_options(word)
-    
-    # Shuffle options but remember correct answer position
-    correct_answer = options[0]
-    shuffled_options = options.copy()
-    random.shuffle(shuffled_options)
-    correct_index = shuffled_options.index(correct_answer)
-    
-    return Div(
-        Div(word, cls='quiz-word'),
-        Div(
-            *[Button(
-                option,
-                cls='option-btn',
-                hx_get=f'/quiz/answer/{word}/{i}/{correct_index}',
-                hx_target='#quiz-content'
-            ) for i, option in enumerate(shuffled_options)],
-            cls='quiz-options'
-        ),
-        cls='card quiz-card'
-    )
+async def quiz_question(session, word: str):
+    options = await get_quiz_options(word)
+    quiz_state = await asyncio.to_thread(load_state, session)
+    card = question_card(quiz_state, word, options)
+    await asyncio.to_thread(save_state, session, quiz_state)
+    prefetch_options(upcoming_words(quiz_state, PREFETCH_AHEAD))
+    return card
+
+@rt('/quiz/stream/{question_id}')
+async def quiz_stream(session, question_id: str):
+    """Server-sent events with the options for a streaming question card."""
+    quiz_state = await asyncio.to_thread(load_state, session)
+    question = quiz_state['question']
+    if not question or question[0] != question_id or question[2] is not None:
+        # No content makes the page fall back to /quiz/question
+        return Response(status_code=204)
+    word, correct_index = question[1], question[3]
+
+    async def events():
+        async for position, result in stream_quiz_options(word, correct_index):
+            if position is not None:
+                yield f"event: option\ndata: {json.dumps({'i': position, 'text': result})}\n\n"
+                continue
+            # The question is only answerable once its options are saved
+            state = await asyncio.to_thread(load_state, session)
+            current = state['question']
+            if current and current[0] == question_id:
+                current[2] = result
+                current[4] = int(time.time() * 1000)
+                await asyncio.to_thread(save_state, session, state)
+            prefetch_options(upcoming_words(state, PREFETCH_AHEAD))
+            yield f"event: done\ndata: {json.dumps(result)}\n\n"
+
+    return EventStream(events())
 
 @rt('/quiz/test/{option_index}')
 def get(option_index: int):
@@ -923,30 +571,48 @@ def get(option_index: int):
         Button('Try Again', cls='btn', hx_get='/quiz/next', hx_target='#quiz-content')
     )
 
-@rt('/quiz/answer/{word}/{answer_index}/{correct_index}')
-def quiz_answer(word: str, answer_index: int, correct_index: int):
-    
+@rt('/quiz/answer/{question_id}/{answer_index}')
+async def quiz_answer(session, question_id: str, answer_index: int):
+    quiz_state = await asyncio.to_thread(load_state, session)
+    question = quiz_state['question']
+    if not question or question[0] != question_id:
+        # Already answered (e.g. a double click) or replaced by a newer question
+        return Div(
+            Div('That question has already been answered.', cls='message error'),
+            Div(
+                Button('Next Word', cls='btn', hx_get='/quiz/next', hx_target='#quiz-content'),
+                style='text-align: center; margin-top: 1rem;'
+            )
+        )
+    _, word, options, correct_index, shown_at = question
+    quiz_state['question'] = None
     is_correct = answer_index == correct_index
+    # A streamed question has no options or shown-at time until its stream completes
+    latency_ms = int(time.time() * 1000) - shown_at if shown_at else None
+    await asyncio.to_thread(record_answer, session_id(session), word, is_correct, latency_ms)
     
     if is_correct:
         quiz_state['streak'] += 1
-        if word in quiz_state['words_remaining']:
-            quiz_state['words_remaining'].remove(word)
+        if word == current_word(quiz_state):
+            quiz_state['position'] += 1
         message = Div('Correct! Well done!', cls='message success')
     else:
         # Reset everything - user must get all words right in a single streak
         quiz_state['streak'] = 0
-        # Reset the word list so they have to start over
-        words = get_active_words()
-        quiz_state['words_remaining'] = [w.word for w in words]
+        # Reshuffle the round so they have to start over
+        restart_round(quiz_state, word)
         
-        # Get the correct answer to show
-        correct_option_text = get_quiz_options(word)[0]
+        # Show the correct answer from the options the student actually saw
         message = Div(
             P('Incorrect! Starting over...', style='font-weight: bold; margin-bottom: 0.5rem;'),
-            P(f'The correct answer was: {correct_option_text}', style='font-size: 0.9rem;'),
+            P(f'The correct answer was: {options[correct_index]}', style='font-size: 0.9rem;') if options else '',
             cls='message error'
         )
+    await asyncio.to_thread(save_state, session, quiz_state)
+    # The round may have been reshuffled, so make sure its first questions are ready
+    upcoming = current_word(quiz_state)
+    if upcoming is not None:
+        prefetch_options([upcoming, *upcoming_words(quiz_state, PREFETCH_AHEAD - 1)])
     
     # Update the stats in the parent element
     stats_update = Div(
@@ -957,7 +623,7 @@ def quiz_answer(word: str, answer_index: int, correct_index: int):
                 cls='stat'
             ),
             Div(
-                Div(f'{quiz_state["total_words"] - len(quiz_state["words_remaining"])}/{quiz_state["total_words"]}', cls='stat-value'),
+                Div(f'{quiz_state["position"]}/{len(quiz_state["deck"])}', cls='stat-value'),
                 Div('This Round', cls='stat-label'),
                 cls='stat'
             ),
@@ -977,9 +643,20 @@ def quiz_answer(word: str, answer_index: int, correct_index: int):
     )
 
 @rt('/api/init')
-def get():
-    reset_quiz()
+def get(session):
+    quiz_state = new_state()
+    reset_quiz(session, quiz_state)
+    save_state(session, quiz_state)
     return {'status': 'initialized'}
 
+@rt('/api/stats')
+def get():
+    return {'option_cache': option_cache.stats(), 'warmer': warmer.stats(), 'db_pool': pool_stats(),
+            'llm_breaker': llm_breaker.stats(), 'llm_batch_breaker': batch_breaker.stats()}
+
+@rt('/metrics')
+def get():
+    return Response(metrics.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
     serve()
\ No newline at end of file
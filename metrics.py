@@ -0,0 +1,297 @@
+"""Request, database and LLM metrics in Prometheus text format.
+
+Counters and histograms are plain dicts updated under a lock, so recording
+costs a few microseconds and is fine to leave on in production. Work done
+for a request (database queries, LLM calls) is also added to that request's
+totals through a context variable, which follows the request into worker
+threads. MetricsMiddleware turns those totals into per-route histograms and,
+with SERVER_TIMING=1, a Server-Timing response header.
+"""
+import os
+import time
+import asyncio
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+
+SERVER_TIMING = os.getenv('SERVER_TIMING', '0') == '1'
+
+# Per-request totals, or None outside a request (e.g. the background warmer)
+_request_totals = ContextVar('request_totals', default=None)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values))
+    return '{' + pairs + '}'
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_label_text(self.labelnames, key)} {_format(value)}')
+        return lines
+
+class Histogram:
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # labels -> [count per bucket (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, '+Inf'), counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _format(float(bound))
+                    labels = _label_text((*self.labelnames, 'le'), (*key, le))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _label_text(self.labelnames, key)
+                lines.append(f'{self.name}_sum{labels} {_format(total)}')
+                lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class Callback:
+    """A gauge or counter read from elsewhere when /metrics is scraped.
+
+    fn returns a number, None to skip it, or a list of (labels dict, number).
+    """
+
+    def __init__(self, name, help, fn, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+
+    def render(self):
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"Error collecting {self.name}: {e}")
+            return []
+        samples = value if isinstance(value, list) else [({}, value)]
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for labels, sample in samples:
+            if sample is not None:
+                lines.append(f'{self.name}{_label_text(labels.keys(), labels.values())} {_format(sample)}')
+        return lines if len(lines) > 2 else []
+
+_registry = []
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+HTTP_DURATION = register(Histogram(
+    'http_request_duration_seconds', 'Time to the first byte of the response, by route template.',
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10), ('method', 'route', 'status')))
+HTTP_DB_QUERIES = register(Histogram(
+    'http_request_db_queries', 'Database queries run while handling a request.',
+    (0, 1, 2, 3, 5, 8, 13, 21, 50), ('route',)))
+DB_QUERY_DURATION = register(Histogram(
+    'db_query_duration_seconds', 'Database statement execution time.',
+    (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)))
+DB_POOL_WAIT = register(Histogram(
+    'db_pool_checkout_seconds', 'Time to check a connection out of the pool, including connecting.',
+    (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)))
+DB_ERRORS = register(Counter('db_errors_total', 'Failed database statements and connections, by exception type.',
+                             ('error',)))
+LLM_DURATION = register(Histogram(
+    'llm_request_duration_seconds', 'Anthropic API call time, by kind of call, model and outcome.',
+    (0.25, 0.5, 1, 2, 4, 8, 16, 32), ('kind', 'model', 'outcome')))
+LLM_TOKENS = register(Counter(
+    'llm_tokens_total', 'Tokens sent to and received from the Anthropic API; cache_write and cache_read '
+    'are prompt tokens written to or read from the prompt cache.', ('kind', 'model', 'direction')))
+LLM_COST = register(Counter('llm_cost_usd_total', 'Estimated Anthropic API spend in US dollars.',
+                            ('kind', 'model')))
+LLM_ERRORS = register(Counter('llm_errors_total', 'Failed Anthropic API calls, by exception type.',
+                              ('kind', 'model', 'error')))
+LLM_REJECTED = register(Counter('llm_rejected_outputs_total',
+                                'Generated option sets that failed validation, by reason.',
+                                ('kind', 'model', 'reason')))
+
+def _add_to_request(field, seconds):
+    totals = _request_totals.get()
+    if totals is not None:
+        totals[field] = totals.get(field, 0.0) + seconds
+        totals[field + '_count'] = totals.get(field + '_count', 0) + 1
+
+@contextmanager
+def llm_call(kind, model=''):
+    """Time an API call. Set call['outcome'] to label a result that was unusable."""
+    call = {'outcome': 'ok'}
+    start = time.perf_counter()
+    try:
+        yield call
+    except asyncio.CancelledError:
+        call['outcome'] = 'cancelled'
+        raise
+    except (asyncio.TimeoutError, TimeoutError):
+        call['outcome'] = 'timeout'
+        LLM_ERRORS.inc(kind=kind, model=model, error='Timeout')
+        raise
+    except Exception as e:
+        call['outcome'] = 'error'
+        LLM_ERRORS.inc(kind=kind, model=model, error=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        LLM_DURATION.observe(elapsed, kind=kind, model=model, outcome=call['outcome'])
+        _add_to_request('llm', elapsed)
+
+_USAGE_FIELDS = (('input', 'input_tokens'), ('output', 'output_tokens'),
+                 ('cache_write', 'cache_creation_input_tokens'), ('cache_read', 'cache_read_input_tokens'))
+
+def record_usage(kind, model, usage, cost=None):
+    """Count a response's tokens and, when the model's price is known, its cost."""
+    if usage is None:
+        return
+    for direction, field in _USAGE_FIELDS:
+        tokens = getattr(usage, field, 0) or 0
+        if tokens or direction in ('input', 'output'):
+            LLM_TOKENS.inc(tokens, kind=kind, model=model, direction=direction)
+    if cost is not None:
+        LLM_COST.inc(cost, kind=kind, model=model)
+
+def instrument_engine(engine):
+    """Time every statement and pool checkout of a SQLAlchemy engine."""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        DB_QUERY_DURATION.observe(elapsed)
+        _add_to_request('db', elapsed)
+
+    @event.listens_for(engine, 'handle_error')
+    def failed_execute(context):
+        # A failed statement never reaches after_cursor_execute, so its start
+        # time is removed here instead of piling up on the pooled connection
+        conn = context.connection
+        started = conn.info.get('query_started') if conn is not None else None
+        if started:
+            elapsed = time.perf_counter() - started.pop()
+            DB_QUERY_DURATION.observe(elapsed)
+            _add_to_request('db', elapsed)
+        DB_ERRORS.inc(error=type(context.original_exception).__name__)
+
+    # The pool has no event before a checkout starts, so its connect is wrapped
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+    pool.connect = timed_connect
+
+# Route templates by endpoint, rebuilt if routes are added
+_templates = {}
+
+def _route_template(scope):
+    """The path template of the route that handled a request, e.g. /quiz/answer/{question_id}/{answer_index}."""
+    if 'route_template' in scope:
+        # Set by middleware that answers without routing, e.g. for static assets
+        return scope['route_template']
+    app = scope.get('app')
+    if app is None:
+        return 'unmatched'
+    endpoint = scope.get('endpoint')
+    if endpoint is None:
+        # Answered before routing, e.g. a 304 from the cache middleware
+        for route in app.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, 'path', 'unmatched')
+        return 'unmatched'
+    if len(_templates) != len(app.routes):
+        _templates.clear()
+        _templates.update({id(getattr(r, 'endpoint', None)): getattr(r, 'path', 'unmatched') for r in app.routes})
+    return _templates.get(id(endpoint), 'unmatched')
+
+class MetricsMiddleware:
+    def __init__(self, app, server_timing=SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        totals = {}
+        token = _request_totals.set(totals)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                totals['app'] = time.perf_counter() - start
+                if self.server_timing:
+                    headers = MutableHeaders(raw=message['headers'])
+                    timings = [f"app;dur={totals['app'] * 1000:.1f}"]
+                    if totals.get('db_count'):
+                        timings.append(f"db;dur={totals['db'] * 1000:.1f};desc=\"queries: {totals['db_count']}\"")
+                    if totals.get('llm_count'):
+                        timings.append(f"llm;dur={totals['llm'] * 1000:.1f}")
+                    headers.append('Server-Timing', ', '.join(timings))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_totals.reset(token)
+            route = _route_template(scope)
+            HTTP_DURATION.observe(totals.get('app', time.perf_counter() - start),
+                                  method=scope['method'], route=route, status=status)
+            HTTP_DB_QUERIES.observe(totals.get('db_count', 0), route=route)
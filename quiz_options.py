@@ -0,0 +1,799 @@
+import os
+import re
+import json
+import random
+import time
+import asyncio
+import threading
+import contextlib
+from collections import OrderedDict
+from anthropic import Anthropic, AsyncAnthropic
+from dotenv import load_dotenv
+from local_options import engine as local_engine, local_quiz_options
+import metrics
+from resilience import CircuitBreaker, LatencyWindow
+
+load_dotenv()
+
+try:
+    from database import get_option_set, save_option_set, save_option_sets
+except Exception as e:
+    print(f"Warning: Option cache database unavailable: {e}")
+    def get_option_set(word, models, prompt_version): return None
+    def save_option_set(word, model, prompt_version, options): return False
+    def save_option_sets(model, prompt_version, option_sets): return 0
+
+# Model ladder: the first model is tried first and the next one only when its
+# output fails validation. QUIZ_MODEL alone still selects a single model.
+MODELS = [m.strip() for m in os.getenv(
+    'QUIZ_MODELS', os.getenv('QUIZ_MODEL', 'claude-3-5-haiku-20241022,claude-3-5-sonnet-20241022')
+).split(',') if m.strip()]
+MODEL = MODELS[0]
+# Bump whenever the prompt below changes so stale option sets are not served
+PROMPT_VERSION = 3
+# Three short options need far less than the old 1000 token budget
+OPTIONS_MAX_TOKENS = int(os.getenv('OPTIONS_MAX_TOKENS', '300'))
+# USD per million input and output tokens; cache writes cost 1.25x input, reads 0.1x
+MODEL_PRICES = {
+    'claude-3-5-haiku-20241022': (0.80, 4.00),
+    'claude-3-5-sonnet-20241022': (3.00, 15.00)
+}
+# Batch generation: output budget per call and the expected cost of one word in it
+BATCH_MAX_TOKENS = int(os.getenv('BATCH_MAX_TOKENS', '4096'))
+BATCH_TOKENS_PER_WORD = 100
+# Seconds before an LLM call is abandoned, and how many may run at once per process
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '20'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+# A student is waiting on request-path calls, so they get a shorter deadline
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', '8'))
+# Circuit breaker: consecutive failed or slower-than-SLO calls before it opens,
+# the latency SLO in seconds, and how long it stays open before a trial call
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_SLO_SECONDS = float(os.getenv('LLM_SLO_SECONDS', '5'))
+LLM_BREAKER_COOLDOWN = float(os.getenv('LLM_BREAKER_COOLDOWN', '30'))
+# Send a second, hedged call when the first is slower than the recent p95
+LLM_HEDGE = os.getenv('LLM_HEDGE', '0') == '1'
+
+# Initialize Anthropic clients (LLM_BACKEND=fake runs without network access).
+# The async client serves requests; the sync one is used by the background warmer.
+try:
+    if os.getenv('LLM_BACKEND') == 'fake':
+        from fake_anthropic import FakeAnthropic, FakeAsyncAnthropic
+        anthropic = FakeAnthropic()
+        async_anthropic = FakeAsyncAnthropic()
+    else:
+        anthropic = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'), timeout=LLM_TIMEOUT)
+        # No SDK retries on the request path: the deadline, hedging and fallbacks cover it
+        async_anthropic = AsyncAnthropic(api_key=os.getenv('ANTHROPIC_API_KEY'), timeout=LLM_TIMEOUT,
+                                         max_retries=0)
+except Exception as e:
+    print(f"Warning: Could not initialize Anthropic client: {e}")
+    anthropic = None
+    async_anthropic = None
+
+_llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+# Generations in progress, so concurrent requests for one word share a single call
+_in_flight = {}
+# Background prefetches, referenced here so they are not garbage collected early
+_prefetches = set()
+
+llm_breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_SLO_SECONDS, LLM_BREAKER_COOLDOWN)
+# Background batches have their own breaker: they are slow by design, so only
+# failures count, and their successes must not close the request path's breaker
+# or take its half-open trial
+batch_breaker = CircuitBreaker(LLM_BREAKER_FAILURES, float('inf'), LLM_BREAKER_COOLDOWN)
+_breakers = {'request': llm_breaker, 'batch': batch_breaker}
+
+LLM_HEDGES = metrics.register(metrics.Counter(
+    'llm_hedged_requests_total', 'Second calls sent because the first was slower than p95, by which one won.',
+    ('winner',)))
+metrics.register(metrics.Callback(
+    'llm_breaker_open', 'Whether an LLM circuit breaker is open (1), half open (0.5) or closed (0).',
+    lambda: [({'breaker': name}, {'closed': 0, 'half_open': 0.5, 'open': 1}[breaker.state])
+             for name, breaker in _breakers.items()]))
+metrics.register(metrics.Callback(
+    'llm_breaker_rejected_total', 'Calls skipped because an LLM circuit breaker was open.',
+    lambda: [({'breaker': name}, breaker.stats()['rejected']) for name, breaker in _breakers.items()],
+    'counter'))
+
+class OptionCache:
+    """Small thread-safe LRU of option sets, keyed by (word, prompt version)."""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        with self._lock:
+            options = self._items.get(key)
+            if options is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            return options
+
+    def peek(self, key):
+        with self._lock:
+            return self._items.get(key)
+
+    def record(self, outcome):
+        """Count a lookup that missed memory: 'db_hits', 'misses' or 'coalesced'."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def put(self, key, options):
+        with self._lock:
+            self._items[key] = options
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.db_hits + self.misses
+            return {
+                'size': len(self._items),
+                'maxsize': self.maxsize,
+                'memory_hits': self.hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_ratio': round((self.hits + self.db_hits) / lookups, 3) if lookups else None
+            }
+
+option_cache = OptionCache(int(os.getenv('OPTION_CACHE_SIZE', '2048')))
+
+metrics.register(metrics.Callback(
+    'option_cache_lookups_total', 'Option lookups by where they were answered.',
+    lambda: [({'result': result}, count) for result, count in option_cache.stats().items()
+             if result in ('memory_hits', 'db_hits', 'misses', 'coalesced')], 'counter'))
+metrics.register(metrics.Callback(
+    'option_cache_hit_ratio', 'Share of option lookups answered from memory or the database.',
+    lambda: option_cache.stats()['hit_ratio']))
+metrics.register(metrics.Callback('option_cache_size', 'Option sets held in memory.',
+                                  lambda: option_cache.stats()['size']))
+
+def fallback_options(word):
+    """Options to show when Claude is unavailable: the local engine, else placeholders."""
+    options = local_quiz_options(word)
+    if options is not None:
+        return options
+    return [
+        f"The correct definition of {word}",
+        f"An incorrect definition of {word} (option 1)",
+        f"An incorrect definition of {word} (option 2)"
+    ]
+
+async def afallback_options(word):
+    """fallback_options for the event loop. Until the local engine has loaded the
+    stored definitions, building options can read the database, so that first
+    happens on a worker thread."""
+    if local_engine.loaded:
+        return fallback_options(word)
+    return await asyncio.to_thread(fallback_options, word)
+
+def cache_key(word):
+    # Option sets from any model in the ladder are equally good, so the model is not part of the key
+    return (word.strip().lower(), PROMPT_VERSION)
+
+def stored_options(word):
+    """Options stored in the database by any model in the ladder, or None."""
+    return get_option_set(cache_key(word)[0], MODELS, PROMPT_VERSION)
+
+def peek_options(word):
+    """Stored options for a word without generating or counting a lookup."""
+    options = option_cache.peek(cache_key(word))
+    if options is None:
+        try:
+            options = stored_options(word)
+        except Exception as e:
+            print(f"Error reading option cache: {e}")
+    return options
+
+def store_options(word, options, model=MODEL):
+    key = cache_key(word)
+    option_cache.put(key, options)
+    local_engine.learn(word, options[0])
+    try:
+        save_option_set(key[0], model, PROMPT_VERSION, options)
+    except Exception as e:
+        print(f"Error saving option cache: {e}")
+
+def store_option_sets(option_sets, model=MODEL):
+    """Store many {word: options} in the LRU and with one multi-row insert."""
+    for word, options in option_sets.items():
+        option_cache.put(cache_key(word), options)
+    local_engine.learn_many((word, options[0]) for word, options in option_sets.items())
+    try:
+        save_option_sets(model, PROMPT_VERSION,
+                         {cache_key(word)[0]: options for word, options in option_sets.items()})
+    except Exception as e:
+        print(f"Error saving option cache: {e}")
+
+def call_cost(model, usage):
+    """USD cost of one call from its usage, or None for a model without a known price."""
+    prices = MODEL_PRICES.get(model)
+    if prices is None or usage is None:
+        return None
+    input_price, output_price = prices
+    tokens = lambda name: getattr(usage, name, 0) or 0
+    return (tokens('input_tokens') * input_price
+            + tokens('cache_creation_input_tokens') * input_price * 1.25
+            + tokens('cache_read_input_tokens') * input_price * 0.1
+            + tokens('output_tokens') * output_price) / 1_000_000
+
+def record_call(kind, model, message):
+    usage = getattr(message, 'usage', None)
+    metrics.record_usage(kind, model, usage, call_cost(model, usage))
+
+# Longest option allowed relative to the shortest, so the answer does not stand
+# out by length. Very short options are measured as OPTIONS_MIN_LENGTH.
+OPTIONS_LENGTH_RATIO = float(os.getenv('OPTIONS_LENGTH_RATIO', '2.5'))
+OPTIONS_MIN_LENGTH = 15
+
+def check_options(options):
+    """None if options are three distinct, non-empty, similar-length options with
+    exactly one marked correct, else (reason, explanation) saying what is wrong.
+
+    Options are {"text": str, "correct": bool} as the tools return them.
+    """
+    if not isinstance(options, list) or not all(
+            isinstance(o, dict) and isinstance(o.get('text'), str) and isinstance(o.get('correct'), bool)
+            for o in options):
+        return 'malformed', 'Each option must have a "text" string and a "correct" true/false flag.'
+    if len(options) != 3:
+        return 'wrong_count', f'You gave {len(options)} options; give exactly 3.'
+    texts = [o['text'].strip() for o in options]
+    if not all(texts):
+        return 'empty', 'One of the options was empty.'
+    if len({t.lower() for t in texts}) != 3:
+        return 'duplicate', 'Two of the options were the same; all three must be different.'
+    marked = sum(o['correct'] for o in options)
+    if marked != 1:
+        return 'correct_count', f'You marked {marked} options as correct; mark exactly one.'
+    lengths = [len(t) for t in texts]
+    if max(lengths) > OPTIONS_LENGTH_RATIO * max(min(lengths), OPTIONS_MIN_LENGTH):
+        return 'unbalanced', (f'The options were very different in length ({min(lengths)} to {max(lengths)} '
+                              'characters), which gives the answer away; make them similar in length.')
+    return None
+
+def correct_first(options):
+    """The texts of checked options, with the one marked correct first."""
+    return ([o['text'] for o in options if o['correct']]
+            + [o['text'] for o in options if not o['correct']])
+
+SYSTEM_PROMPT = "You are a vocabulary tutor helping students prepare for the 11+ exam. Generate challenging but fair multiple choice options."
+
+# Everything that is the same for every word goes in the system prompt, which
+# is marked for prompt caching. The API only caches a prefix (tools and system
+# prompt) of at least 1024 tokens for Sonnet and 2048 for Haiku; these are a few
+# hundred, so caching has no effect at the current prompt size. It starts to
+# apply by itself if the instructions grow past that, e.g. with examples.
+OPTIONS_INSTRUCTIONS = """For the word in the user's message, generate 3 different definitions or uses for a multiple choice quiz.
+
+Exactly one must be the CORRECT definition/use, in the position the user's message asks for.
+The other two should be plausible but incorrect alternatives that would make the quiz reasonably challenging.
+Make sure the options are of similar length and complexity.
+
+Record the three options, in order, with the record_options tool, marking the correct one
+with "correct": true and the other two with "correct": false."""
+
+BATCH_INSTRUCTIONS = """For each word in the user's message, generate 3 different definitions or uses for a multiple choice quiz.
+
+For every word exactly one option must be the CORRECT definition/use.
+The other two should be plausible but incorrect alternatives that would make the quiz reasonably challenging.
+Make sure the options for a word are of similar length and complexity.
+
+Record them with the record_option_sets tool, one item per word, in the same order as the words,
+marking each correct option with "correct": true and the others with "correct": false."""
+
+# Each option says whether it is the correct one, so the answer never depends
+# on the model putting it in the position it was asked to
+_OPTIONS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"text": {"type": "string", "minLength": 1}, "correct": {"type": "boolean"}},
+        "required": ["text", "correct"]
+    },
+    "minItems": 3,
+    "maxItems": 3
+}
+
+# The model is made to answer by calling these tools, so its output always
+# arrives as arguments matching the schema rather than JSON inside free text
+OPTIONS_TOOL = {
+    "name": "record_options",
+    "description": "Record the three multiple choice options for the word, in order, marking the correct one.",
+    "input_schema": {
+        "type": "object",
+        "properties": {"options": _OPTIONS_SCHEMA},
+        "required": ["options"]
+    }
+}
+
+BATCH_TOOL = {
+    "name": "record_option_sets",
+    "description": "Record the three multiple choice options for each word, marking the correct one.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "items": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"word": {"type": "string"}, "options": _OPTIONS_SCHEMA},
+                    "required": ["word", "options"]
+                }
+            }
+        },
+        "required": ["items"]
+    }
+}
+
+def cached_system(instructions):
+    # Not cached while the prompt is below the minimum cacheable length; see above
+    return [{"type": "text", "text": f"{SYSTEM_PROMPT}\n\n{instructions}",
+             "cache_control": {"type": "ephemeral"}}]
+
+ORDINALS = ('first', 'second', 'third')
+
+def build_request(word, correct_index=0, model=MODEL):
+    """The single-word prompt. Streaming asks for the correct option at a random
+    position, so the order options arrive in does not give the answer away."""
+    return dict(
+        model=model,
+        max_tokens=OPTIONS_MAX_TOKENS,
+        temperature=0.7,
+        system=cached_system(OPTIONS_INSTRUCTIONS),
+        tools=[OPTIONS_TOOL],
+        tool_choice={"type": "tool", "name": OPTIONS_TOOL["name"]},
+        messages=[{
+            "role": "user",
+            "content": f'Word: "{word}"\nThe {ORDINALS[correct_index]} one must be the CORRECT definition/use.'
+        }]
+    )
+
+def _tool_call(message, name):
+    for block in getattr(message, 'content', None) or []:
+        if getattr(block, 'type', None) == 'tool_use' and block.name == name:
+            return block
+    return None
+
+def parse_options(message, kind='single'):
+    """(options, None) from a record_options call, or (None, (reason, explanation)).
+
+    Options are returned with the one the model marked correct first, wherever
+    it put it.
+    Rejected responses are counted in llm_rejected_outputs_total by reason.
+    """
+    call = _tool_call(message, OPTIONS_TOOL['name'])
+    if getattr(message, 'stop_reason', None) == 'max_tokens':
+        problem = 'truncated', 'Your answer was cut off; keep each option to one short sentence.'
+    elif call is None or not isinstance(call.input, dict):
+        problem = 'no_tool_call', 'Answer by calling the record_options tool.'
+    else:
+        problem = check_options(call.input.get('options'))
+    if problem is None:
+        return correct_first(call.input['options']), None
+    metrics.LLM_REJECTED.inc(kind=kind, model=getattr(message, 'model', ''), reason=problem[0])
+    return None, problem
+
+def build_repair_request(request, message, problem):
+    """The same conversation with the rejected answer and what was wrong with it,
+    so the retry fixes that rather than starting again."""
+    reason, explanation = problem
+    call = _tool_call(message, OPTIONS_TOOL['name'])
+    if call is None:
+        turn = request['messages'][-1]
+        return dict(request, messages=request['messages'][:-1] + [
+            dict(turn, content=f"{turn['content']}\n\nYour last answer was rejected: {explanation}")])
+    return dict(request, messages=request['messages'] + [
+        {"role": "assistant",
+         "content": [{"type": "tool_use", "id": call.id, "name": call.name, "input": call.input}]},
+        {"role": "user",
+         "content": [{"type": "tool_result", "tool_use_id": call.id, "is_error": True,
+                      "content": f"Rejected: {explanation} Call record_options again with corrected options."}]}
+    ])
+
+def repair_models(models):
+    """Models for the first call and its single repair: the repair goes to the
+    next model in the ladder, or the same one if there is only one."""
+    return list(models[:2]) if len(models) > 1 else list(models) * 2
+
+_OPTIONS_START = re.compile(r'"options"\s*:\s*\[')
+_OPTIONS_SEPARATOR = re.compile(r'\s*,?\s*')
+_decoder = json.JSONDecoder()
+
+class OptionsParser:
+    """Pulls the texts of the "options" array out of tool input JSON as it streams in."""
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = None  # where the next array item starts, once the array is found
+        self.options = []
+        self.complete = False
+
+    def feed(self, text):
+        """Add streamed text and return the texts of any options it completed."""
+        self.buffer += text
+        if self.pos is None:
+            match = _OPTIONS_START.search(self.buffer)
+            if not match:
+                return []
+            self.pos = match.end()
+        found = []
+        while not self.complete:
+            start = _OPTIONS_SEPARATOR.match(self.buffer, self.pos).end()
+            if self.buffer.startswith(']', start):
+                self.complete = True
+                break
+            try:
+                # Fails until the whole option object has arrived
+                item, self.pos = _decoder.raw_decode(self.buffer, start)
+            except ValueError:
+                break
+            if isinstance(item, dict) and isinstance(item.get('text'), str):
+                found.append(item['text'])
+        self.options.extend(found)
+        return found
+
+def batch_chunks(words):
+    """Split words into groups whose expected output fits BATCH_MAX_TOKENS."""
+    size = max(1, BATCH_MAX_TOKENS // BATCH_TOKENS_PER_WORD)
+    return [words[i:i + size] for i in range(0, len(words), size)]
+
+def build_batch_request(words, model=MODEL):
+    return dict(
+        model=model,
+        max_tokens=min(BATCH_MAX_TOKENS, BATCH_TOKENS_PER_WORD * len(words) + 100),
+        temperature=0.7,
+        system=cached_system(BATCH_INSTRUCTIONS),
+        tools=[BATCH_TOOL],
+        tool_choice={"type": "tool", "name": BATCH_TOOL["name"]},
+        messages=[{"role": "user", "content": f"WORDS: {json.dumps(words)}"}]
+    )
+
+def parse_batch(message, words):
+    """Valid option sets from a batch response, keyed by the requested word.
+
+    Each rejected item is counted; the warmer retries those words on their own.
+    """
+    model = getattr(message, 'model', '')
+    call = _tool_call(message, BATCH_TOOL['name'])
+    items = call.input.get('items') if call is not None and isinstance(call.input, dict) else None
+    if not isinstance(items, list):
+        metrics.LLM_REJECTED.inc(kind='batch', model=model, reason='no_tool_call')
+        return {}
+    wanted = {word.strip().lower(): word for word in words}
+    results = {}
+    for item in items:
+        word = wanted.get(str(item.get('word', '')).strip().lower()) if isinstance(item, dict) else None
+        if word is None:
+            metrics.LLM_REJECTED.inc(kind='batch', model=model, reason='unknown_word')
+            continue
+        problem = check_options(item.get('options'))
+        if problem is not None:
+            metrics.LLM_REJECTED.inc(kind='batch', model=model, reason=problem[0])
+        else:
+            results[word] = correct_first(item['options'])
+    return results
+
+def generate_options_batch(words, client=None, model=MODEL):
+    """Generate options for many words with one call per chunk.
+
+    Returns ({word: options}, skipped). Words missing from the results failed
+    and can be retried on their own, e.g. with the next model; skipped lists
+    the words whose chunk was not sent because batch_breaker was open.
+    """
+    client = client or anthropic
+    if client is None:
+        return {}, []
+
+    results, skipped = {}, []
+    for chunk in batch_chunks(list(words)):
+        if not batch_breaker.allow():
+            skipped.extend(chunk)
+            continue
+        try:
+            with metrics.llm_call('batch', model) as call:
+                message = client.messages.create(**build_batch_request(chunk, model))
+                record_call('batch', model, message)
+                parsed = parse_batch(message, chunk)
+                if len(parsed) < len(chunk):
+                    call['outcome'] = 'partial' if parsed else 'invalid'
+            results.update(parsed)
+            batch_breaker.record(True)
+        except Exception as e:
+            batch_breaker.record(False)
+            print(f"Error getting batch options from Claude: {e}")
+    return results, skipped
+
+# Recent call times per model, for the hedging delay
+_latencies = {}
+
+def _latency(model):
+    window = _latencies.get(model)
+    if window is None:
+        window = _latencies[model] = LatencyWindow()
+    return window
+
+async def _call_options(request, client):
+    """One single-word call, bounded by LLM_MAX_CONCURRENCY.
+
+    Returns (options, message, problem) as parse_options does, plus the message.
+    """
+    model = request['model']
+    async with _llm_slots:
+        start = time.monotonic()
+        try:
+            with metrics.llm_call('single', model) as call:
+                message = await client.messages.create(**request)
+                record_call('single', model, message)
+                options, problem = parse_options(message)
+                if options is None:
+                    call['outcome'] = 'invalid'
+        except asyncio.CancelledError:
+            # A call cancelled by hedging or the deadline took at least this long,
+            # so it still counts towards the p95 rather than hiding the slow tail
+            _latency(model).add(time.monotonic() - start)
+            raise
+        _latency(model).add(time.monotonic() - start)
+    return options, message, problem
+
+async def _hedged_call(request, client):
+    """Call once, and again if the first call outlasts the recent p95; first usable result wins."""
+    first = asyncio.ensure_future(_call_options(request, client))
+    pending = {first}
+    try:
+        delay = _latency(request['model']).percentile(95) if LLM_HEDGE else None
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return first.result()
+        second = asyncio.ensure_future(_call_options(request, client))
+        pending.add(second)
+        error = result = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                result = task.result()
+                if result[0] is not None:
+                    LLM_HEDGES.inc(winner='hedge' if task is second else 'first')
+                    return result
+        LLM_HEDGES.inc(winner='neither')
+        if result is None:
+            raise error
+        # Both answers were rejected; either will do for the repair
+        return result
+    finally:
+        # Also cancels the calls when the deadline runs out
+        for task in pending:
+            task.cancel()
+
+async def _climb_ladder(request, client, models):
+    """Call the first model, sending each rejected answer back to the next one to
+    repair. API errors are not retried."""
+    for model in models:
+        request = dict(request, model=model)
+        options, message, problem = await _hedged_call(request, client)
+        if options is not None:
+            return options, model
+        request = build_repair_request(request, message, problem)
+    return None, None
+
+async def agenerate_quiz_options(word, client=None, repair=None):
+    """Ask Claude for options on the request path, repairing a rejected answer
+    with the next model in the ladder. Returns (options, model), or (None, None).
+
+    Bounded by LLM_DEADLINE, optionally hedged, and skipped entirely while
+    the circuit breaker is open so the caller can fall back straight away.
+    repair=(request, message, problem) starts from a repair of that rejected
+    answer instead of a new request.
+    """
+    client = client or async_anthropic
+    if client is None or not llm_breaker.allow():
+        return None, None
+
+    if repair is None:
+        request, models = build_request(word), repair_models(MODELS)
+    else:
+        request, models = build_repair_request(*repair), repair_models(MODELS)[1:]
+    start = time.monotonic()
+    try:
+        result = await asyncio.wait_for(_climb_ladder(request, client, models), LLM_DEADLINE)
+    except Exception as e:
+        llm_breaker.record(False)
+        print(f"Error getting options from Claude: {e!r}")
+        return None, None
+    llm_breaker.record(True, time.monotonic() - start)
+    return result
+
+async def _load_options(word, key):
+    try:
+        options = await asyncio.to_thread(stored_options, word)
+    except Exception as e:
+        print(f"Error reading option cache: {e}")
+        options = None
+    if options is not None:
+        option_cache.record('db_hits')
+        option_cache.put(key, options)
+        return options
+
+    option_cache.record('misses')
+    options, model = await agenerate_quiz_options(word)
+    if options is not None:
+        await asyncio.to_thread(store_options, word, options, model)
+    return options
+
+async def get_quiz_options(word):
+    """Get multiple choice options, correct option first.
+
+    Served from the in-process LRU, then the quiz_option_sets table, and only
+    generated with Claude when neither has the word. Concurrent misses for the
+    same word wait on one shared lookup.
+    """
+    key = cache_key(word)
+    options = option_cache.get(key)
+    if options is not None:
+        return options
+
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_load_options(word, key))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    else:
+        option_cache.record('coalesced')
+    # Shielded so one client disconnecting does not cancel the call for the others
+    options = await asyncio.shield(task)
+    if options is None:
+        # Fallbacks are never cached so the word is retried next time
+        return await afallback_options(word)
+    return options
+
+def arrange(options, correct_index, order=()):
+    """Options as shown: the correct one (options[0]) at correct_index, and the
+    distractors in their order in `order` if it has them all, else shuffled."""
+    shown = [o for o in order if o in options[1:]]
+    if len(shown) != len(options) - 1:
+        shown = list(options[1:])
+        random.shuffle(shown)
+    shown.insert(correct_index, options[0])
+    return shown
+
+async def _stream_generate(request, client, result):
+    """Yield options from a streamed response as each one completes, in prompt order.
+
+    Once the stream ends, result holds the 'options', 'problem' and 'message'
+    of the complete response, as checked by parse_options, and the option
+    texts in the order they were 'streamed'.
+    """
+    parser = OptionsParser()
+    deadline = asyncio.get_running_loop().time() + LLM_DEADLINE
+    model = request['model']
+    # Every wait - for a free slot, the response headers, each event - shares one
+    # deadline. The timeout is never held across a yield, where it would cancel
+    # whatever the consumer happened to be awaiting instead of this call.
+    async with contextlib.AsyncExitStack() as stack:
+        async with asyncio.timeout_at(deadline):
+            await stack.enter_async_context(_llm_slots)
+        call = stack.enter_context(metrics.llm_call('stream', model))
+        async with asyncio.timeout_at(deadline):
+            stream = await stack.enter_async_context(client.messages.stream(**request))
+        events = stream.__aiter__()
+        while True:
+            try:
+                async with asyncio.timeout_at(deadline):
+                    event = await events.__anext__()
+            except StopAsyncIteration:
+                break
+            # The tool's arguments arrive as fragments of JSON
+            if event.type == 'input_json':
+                for option in parser.feed(event.partial_json):
+                    yield option
+        async with asyncio.timeout_at(deadline):
+            message = await stream.get_final_message()
+        record_call('stream', model, message)
+        result['options'], result['problem'] = parse_options(message, 'stream')
+        result['message'] = message
+        result['streamed'] = parser.options
+        if result['options'] is None:
+            call['outcome'] = 'invalid'
+
+def _settle(key, shared, options):
+    """Hand a streamed generation's result to the requests waiting on it."""
+    if not shared.done():
+        shared.set_result(options)
+    if _in_flight.get(key) is shared:
+        del _in_flight[key]
+
+async def stream_quiz_options(word, correct_index, client=None):
+    """Yield (position, option) as options are generated, then (None, all options).
+
+    Options are in display order with the correct one at correct_index. The
+    final list is authoritative: it replaces anything streamed before it, e.g.
+    when the stream failed part way and fallback options are used instead.
+    Cached options are yielded straight away as the final list.
+
+    While it runs, the stream is the word's in-flight generation, so other
+    streams and get_quiz_options for the word wait for its result.
+    """
+    key = cache_key(word)
+    options = option_cache.get(key)
+    if options is None and key in _in_flight:
+        # Another request is already generating this word; wait for it instead of paying twice
+        options = await get_quiz_options(word)
+    if options is not None:
+        yield None, arrange(options, correct_index)
+        return
+
+    # Registered before the first await, so a concurrent miss always finds it
+    shared = asyncio.get_running_loop().create_future()
+    _in_flight[key] = shared
+    try:
+        try:
+            options = await asyncio.to_thread(stored_options, word)
+        except Exception as e:
+            print(f"Error reading option cache: {e}")
+        if options is not None:
+            option_cache.record('db_hits')
+            option_cache.put(key, options)
+            _settle(key, shared, options)
+            yield None, arrange(options, correct_index)
+            return
+
+        option_cache.record('misses')
+        client = client or async_anthropic
+        request = build_request(word, correct_index)
+        result = {}
+        if client is not None and llm_breaker.allow():
+            start = time.monotonic()
+            try:
+                shown = 0
+                async for option in _stream_generate(request, client, result):
+                    if shown < 3:
+                        yield shown, option
+                    shown += 1
+                llm_breaker.record(True, time.monotonic() - start)
+            except Exception as e:
+                llm_breaker.record(False)
+                print(f"Error streaming options from Claude: {e!r}")
+
+        options = result.get('options')
+        if options is None and result.get('problem'):
+            # The stream finished but its answer was rejected; send it back to be repaired
+            options, model = await agenerate_quiz_options(
+                word, client, repair=(request, result['message'], result['problem']))
+        else:
+            model = MODEL
+        if options is not None:
+            await asyncio.to_thread(store_options, word, options, model)
+            _settle(key, shared, options)
+            # The correct option is the one the model marked, moved to correct_index if
+            # it was written elsewhere; the others keep the order they streamed in
+            yield None, arrange(options, correct_index, result.get('streamed', ()))
+            return
+        # Fallbacks are never cached so the word is retried next time; waiters make their own
+        _settle(key, shared, None)
+        yield None, arrange(await afallback_options(word), correct_index)
+    finally:
+        # Also when the client went away part way, so no one waits on a stream that stopped
+        _settle(key, shared, options)
+
+def prefetch_options(words):
+    """Start loading options for upcoming words without waiting for them."""
+    for word in words:
+        key = cache_key(word)
+        if option_cache.peek(key) is None and key not in _in_flight:
+            task = asyncio.ensure_future(get_quiz_options(word))
+            _prefetches.add(task)
+            task.add_done_callback(_prefetches.discard)
@@ -0,0 +1,208 @@
+"""Per-session quiz progress.
+
+The FastHTML session cookie only carries a random session id. The progress
+itself lives in one quiz_sessions row, stored as compact versioned JSON, so any
+instance can serve any request and each answer reads and writes a single small
+row. The round's deck is written to its own quiz_decks row only when a round
+starts or restarts, as word ids mapped back through the cached word list, and
+each instance keeps recently used decks decoded in memory.
+"""
+import os
+import json
+import random
+import secrets
+import threading
+from collections import OrderedDict
+
+try:
+    from database import (load_quiz_state, save_quiz_state, load_quiz_deck, save_quiz_deck,
+                          cached_word_lookups, cached_word_list_version)
+except Exception as e:
+    print(f"Warning: Quiz session database unavailable: {e}")
+    # Fall back to process memory so the quiz still works on one instance
+    _memory_states = {}
+    _memory_decks = {}
+    def load_quiz_state(session_id): return _memory_states.get(session_id)
+    def save_quiz_state(session_id, state): _memory_states[session_id] = state
+    def load_quiz_deck(session_id): return _memory_decks.get(session_id)
+    def save_quiz_deck(session_id, round_id, deck): _memory_decks[session_id] = (round_id, deck)
+    def cached_word_lookups(): return {}, {}
+    def cached_word_list_version(): return None
+
+# Bump when the serialized layout changes; older rows then start a fresh round
+STATE_VERSION = 6
+
+# Short keys keep the stored row small
+_FIELDS = {
+    # Identifies the deck in quiz_decks that position indexes into
+    'round': 'r',
+    'position': 'p',
+    'streak': 's',
+    'correct_answers': 'c',
+    # [question id, word, options as shown, index of the correct option, shown at (ms)];
+    # a streamed question has no options or shown-at time until its stream completes
+    'question': 'q'
+}
+
+def new_state():
+    return {
+        # The round's words in a pre-shuffled order; None for words removed since it started
+        'deck': [],
+        'round': None,
+        'position': 0,
+        'streak': 0,
+        'correct_answers': 0,
+        'question': None
+    }
+
+# A missed word comes back this many questions into the restarted round
+RELEARN_GAP = 2
+
+def start_round(state, deck):
+    """Begin a round that asks the words in deck order."""
+    state['deck'] = list(deck)
+    state['round'] = secrets.token_hex(8)
+    state['position'] = 0
+    state['streak'] = 0
+    state['correct_answers'] = 0
+    state['question'] = None
+
+def restart_round(state, missed_word=None):
+    """Start the same words over in a new order, without going back to the database.
+
+    The word just missed is asked again shortly after the restart.
+    """
+    # A new list, since decoded decks are shared between requests
+    deck = [word for word in state['deck'] if word is not None]
+    random.shuffle(deck)
+    if missed_word in deck:
+        deck.remove(missed_word)
+        deck.insert(min(RELEARN_GAP, len(deck)), missed_word)
+    state['deck'] = deck
+    state['round'] = secrets.token_hex(8)
+    state['position'] = 0
+
+def current_word(state):
+    """The word being asked, or None once the round is complete."""
+    deck = state['deck']
+    # Words removed from the list during the round are skipped
+    while state['position'] < len(deck) and deck[state['position']] is None:
+        state['position'] += 1
+    if state['position'] < len(deck):
+        return deck[state['position']]
+    return None
+
+def upcoming_words(state, count):
+    deck = state['deck']
+    words = []
+    index = state['position'] + 1
+    while index < len(deck) and len(words) < count:
+        if deck[index] is not None:
+            words.append(deck[index])
+        index += 1
+    return words
+
+def _encode_deck(deck):
+    ids, _ = cached_word_lookups()
+    return [ids.get(word, word) for word in deck]
+
+def _decode_deck(entries):
+    """The words of a stored deck, with None in place of words removed since."""
+    _, words = cached_word_lookups()
+    return [words.get(entry) if isinstance(entry, int) else entry for entry in entries]
+
+# Decoded decks of recent sessions: session id -> [round id, word list version, entries, words]
+DECK_CACHE_SIZE = int(os.getenv('DECK_CACHE_SIZE', '1024'))
+_decks = OrderedDict()
+_decks_lock = threading.Lock()
+
+def _cached_deck(sid, round_id):
+    with _decks_lock:
+        entry = _decks.get(sid)
+        if entry is None or entry[0] != round_id:
+            return None
+        _decks.move_to_end(sid)
+        return entry
+
+def _remember_deck(sid, entry):
+    with _decks_lock:
+        _decks[sid] = entry
+        _decks.move_to_end(sid)
+        while len(_decks) > DECK_CACHE_SIZE:
+            _decks.popitem(last=False)
+
+def _load_deck(sid, round_id):
+    """The words of a session's round, or None if its deck row is for another round.
+
+    A round's deck never changes, so it is read once per instance and only
+    decoded again after the word list changes.
+    """
+    if round_id is None:
+        return []
+    version = cached_word_list_version()
+    entry = _cached_deck(sid, round_id)
+    if entry is None:
+        row = load_quiz_deck(sid)
+        if row is None or row[0] != round_id:
+            return None
+        entry = [round_id, None, json.loads(row[1]), None]
+    if entry[1] != version:
+        entry = [round_id, version, entry[2], _decode_deck(entry[2])]
+        _remember_deck(sid, entry)
+    return entry[3]
+
+def _save_deck(sid, state):
+    """Write the deck if this round's deck has not been written yet."""
+    if state['round'] is None or _cached_deck(sid, state['round']) is not None:
+        return
+    entries = _encode_deck(state['deck'])
+    save_quiz_deck(sid, state['round'], json.dumps(entries, separators=(',', ':')))
+    _remember_deck(sid, [state['round'], cached_word_list_version(), entries, state['deck']])
+
+def dumps(state):
+    data = {short: state[name] for name, short in _FIELDS.items()}
+    data['v'] = STATE_VERSION
+    return json.dumps(data, separators=(',', ':'))
+
+def loads(blob):
+    """Decode a stored state without its deck, or None if it is missing or from another version."""
+    if not blob:
+        return None
+    try:
+        data = json.loads(blob)
+    except ValueError:
+        return None
+    if data.get('v') != STATE_VERSION:
+        return None
+    state = new_state()
+    state.update({name: data[short] for name, short in _FIELDS.items()})
+    return state
+
+def session_id(session):
+    sid = session.get('sid')
+    if not sid:
+        sid = session['sid'] = secrets.token_hex(16)
+    return sid
+
+def load_state(session):
+    """The quiz state for this session, or a fresh empty one."""
+    sid = session_id(session)
+    try:
+        state = loads(load_quiz_state(sid))
+        if state is not None:
+            state['deck'] = _load_deck(sid, state['round'])
+            if state['deck'] is None:
+                # The deck row belongs to another round, e.g. from a second tab
+                state = None
+    except Exception as e:
+        print(f"Error loading quiz state: {e}")
+        state = None
+    return state or new_state()
+
+def save_state(session, state):
+    sid = session_id(session)
+    try:
+        _save_deck(sid, state)
+        save_quiz_state(sid, dumps(state))
+    except Exception as e:
+        print(f"Error saving quiz state: {e}")
@@ -0,0 +1,93 @@
+"""Protection for the request path against a slow or failing Anthropic API.
+
+CircuitBreaker stops calls after a run of failures or calls slower than the
+latency SLO, so quiz requests fall back to cached or local options at once
+instead of each waiting out a deadline. After a cooldown one trial call is let
+through; it closes the breaker again if it succeeds in time.
+
+LatencyWindow keeps recent call times so a hedged request can be sent once a
+call has taken longer than the observed p95.
+"""
+import time
+import threading
+from collections import deque
+
+class LatencyWindow:
+    def __init__(self, size=200, min_samples=20):
+        self._samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, pct):
+        """The pct percentile of recent samples, or None until there are enough."""
+        samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, slo_seconds=5.0, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.slo_seconds = slo_seconds
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = None
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow(self):
+        """Whether a call may be made now. Half-open lets one trial call through."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self._state == self.OPEN and now - self._opened_at >= self.cooldown:
+                self._state = self.HALF_OPEN
+                self._trial_started = None
+            if self._state == self.HALF_OPEN:
+                # A trial that never reported back does not block the breaker forever
+                if self._trial_started is None or now - self._trial_started >= self.cooldown:
+                    self._trial_started = now
+                    return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self):
+        """Seconds until the cooldown ends while open; 0 when closed or half open."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def record(self, ok, seconds=None):
+        """Report a call. Calls slower than the SLO count as failures."""
+        failed = not ok or (seconds is not None and seconds > self.slo_seconds)
+        with self._lock:
+            if not failed:
+                self._state = self.CLOSED
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.trips += 1
+                    print(f"LLM circuit breaker open after {self._failures} failed or slow calls")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {'state': self._state, 'consecutive_failures': self._failures,
+                    'trips': self.trips, 'rejected': self.rejected}
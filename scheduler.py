@@ -0,0 +1,42 @@
+"""Leitner spaced repetition for the quiz.
+
+Every answer is logged in quiz_attempts and moves the word between Leitner
+boxes in word_progress. New rounds start with the words that are due for
+review, pulled from an index on (session_id, due_at), so weak words come up
+early without scanning the whole word list or attempt history.
+"""
+import os
+import random
+
+try:
+    from database import record_attempt, get_due_words
+except Exception as e:
+    print(f"Warning: Scheduler database unavailable: {e}")
+    def record_attempt(session_id, word, correct, latency_ms, intervals): return False
+    def get_due_words(session_id, limit): return []
+
+# Seconds a word waits before it is due again, by Leitner box
+LEITNER_INTERVALS = (0, 10 * 60, 24 * 3600, 3 * 24 * 3600, 7 * 24 * 3600, 21 * 24 * 3600)
+# How many due words are moved to the front of a new round
+DUE_LIMIT = int(os.getenv('SCHEDULER_DUE_LIMIT', '50'))
+
+def order_round(session_id, words):
+    """Due words first, most overdue first, then the rest in a random order."""
+    try:
+        due = get_due_words(session_id, DUE_LIMIT)
+    except Exception as e:
+        print(f"Error loading due words: {e}")
+        due = []
+    in_round = set(words)
+    due = [w for w in due if w in in_round]
+    scheduled = set(due)
+    rest = [w for w in words if w not in scheduled]
+    random.shuffle(rest)
+    return due + rest
+
+def record_answer(session_id, word, correct, latency_ms=None):
+    try:
+        return record_attempt(session_id, word, correct, latency_ms, LEITNER_INTERVALS)
+    except Exception as e:
+        print(f"Error recording attempt for '{word}': {e}")
+        return False
@@ -0,0 +1,19 @@
+"""Run every test against a throwaway SQLite database and the offline fake Anthropic client.
+
+The environment is set here, before any app module is imported, because the
+database URL and LLM backend are read at import time.
+"""
+import os
+import sys
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix='vocab-tests-')
+for name in ('POSTGRES_URL', 'POSTGRES_URL_NON_POOLING'):
+    os.environ.pop(name, None)
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ['DB_AUTO_INIT'] = '1'
+os.environ['LLM_BACKEND'] = 'fake'
+os.environ['FAKE_LLM_LATENCY_MS'] = '0'
+os.environ['FAKE_LLM_FAILURE_RATE'] = '0'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+import pytest
+from starlette.testclient import TestClient
+import database
+import main
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main.warmer, '_started', True)
+    return TestClient(main.app)
+
+def test_unchanged_word_list_is_answered_with_304(client):
+    first = client.get('/config')
+    etag = first.headers['etag']
+    assert first.status_code == 200 and first.headers['cache-control'] == 'no-cache'
+
+    again = client.get('/config', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.content == b''
+    assert again.headers['etag'] == etag
+
+def test_changing_the_word_list_changes_the_etag(client):
+    etag = client.get('/config').headers['etag']
+    new_id = database.add_word('etagword')
+    try:
+        changed = client.get('/config', headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and changed.headers['etag'] != etag
+        assert 'etagword' in changed.text
+    finally:
+        database.remove_word(new_id)
+
+def test_fragments_and_pages_get_different_etags(client):
+    page = client.get('/config/words', params={'q': 'ab'})
+    fragment = client.get('/config/words', params={'q': 'ab'}, headers={'HX-Request': 'true'})
+    other_query = client.get('/config/words', params={'q': 'ac'})
+    assert len({page.headers['etag'], fragment.headers['etag'], other_query.headers['etag']}) == 3
+    assert 'HX-Request' in fragment.headers['vary']
+    assert client.get('/config/words', params={'q': 'ab'},
+                      headers={'If-None-Match': fragment.headers['etag']}).status_code == 200
+
+def test_pages_without_a_validator_have_no_etag(client):
+    assert 'etag' not in client.get('/quiz').headers
+
+@pytest.mark.parametrize('accept, coding', [('br, gzip', 'br'), ('gzip', 'gzip'), ('identity', None)])
+def test_large_responses_are_compressed_as_the_client_prefers(client, accept, coding):
+    response = client.get('/config', headers={'Accept-Encoding': accept})
+    assert response.headers.get('content-encoding') == coding
+    assert 'Accept-Encoding' in response.headers['vary']
+    assert 'Manage Vocabulary' in response.text
+
+def test_small_responses_are_sent_uncompressed(client):
+    response = client.get('/test', headers={'Accept-Encoding': 'gzip', 'HX-Request': 'true'})
+    assert 'content-encoding' not in response.headers
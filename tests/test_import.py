@@ -0,0 +1,35 @@
+from starlette.testclient import TestClient
+import database
+import main
+from main import parse_words
+
+def test_parse_words_splits_pasted_text_and_normalizes():
+    words, rejected = parse_words('Serene, Gloomy;hasty\n\n  "Weary" \tserene\nwell-known')
+    assert words == ['serene', 'gloomy', 'hasty', 'weary', 'well-known']
+    assert rejected == 0
+
+def test_parse_words_counts_entries_that_are_not_words():
+    words, rejected = parse_words('serene\n1234\nhasty!\n' + 'a' * 51 + '\n-dash')
+    assert words == ['serene']
+    assert rejected == 4
+
+def test_parse_words_reads_the_first_non_empty_csv_column_and_skips_the_header():
+    text = 'Word,Meaning\nserene,"calm, peaceful"\n,gloomy\nhasty,quick\n'
+    words, rejected = parse_words(text, 'list.CSV')
+    assert words == ['serene', 'gloomy', 'hasty']
+    assert rejected == 0
+
+def test_import_adds_new_words_and_reports_the_rest(monkeypatch):
+    warmed = []
+    # Only the words queued by the import itself, not the first request's warm start
+    monkeypatch.setattr(main.warmer, '_started', True)
+    monkeypatch.setattr(main.warmer, 'warm', warmed.extend)
+    client = TestClient(main.app)
+
+    page = client.post('/import', data={'words': 'abhor, importone'},
+                       files={'file': ('more.csv', b'word\nimporttwo\n12\n', 'text/csv')}).text
+
+    assert 'Added: 2' in page and 'Already in your list: 1' in page and 'Skipped (not words): 1' in page
+    assert warmed == ['importone', 'importtwo']
+    words = {word for _, word in database.cached_active_words()}
+    assert {'importone', 'importtwo'} <= words
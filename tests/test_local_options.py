@@ -0,0 +1,58 @@
+import random
+import local_options
+from local_options import LocalOptionEngine
+
+def buckets(engine):
+    return {pos: (list(lengths), list(words)) for pos, (lengths, words) in engine._buckets.items()}
+
+def test_learning_keeps_the_index_as_a_full_rebuild_would(monkeypatch):
+    monkeypatch.setattr(local_options, 'get_stored_definitions', lambda: iter(()))
+    engine = LocalOptionEngine()
+    engine.learn('zephyr', 'A soft, gentle breeze')
+    engine.learn('abhor', 'To hate something very much')
+    engine.learn('zephyr', 'A light wind from the west that is soft and warm')
+    learned = buckets(engine)
+    engine._reindex()
+    rebuilt = buckets(engine)
+    # Equal lengths may be ordered differently, so compare the (length, word) pairs
+    assert {pos: sorted(zip(*b)) for pos, b in learned.items()} == \
+        {pos: sorted(zip(*b)) for pos, b in rebuilt.items()}
+    assert all(lengths == sorted(lengths) for lengths, _ in learned.values())
+    assert sum(words.count('zephyr') for _, words in learned.values()) == 1
+
+def test_options_put_the_definition_first_with_two_other_definitions(monkeypatch):
+    monkeypatch.setattr(local_options, 'get_stored_definitions', lambda: iter(()))
+    engine = LocalOptionEngine()
+    options = engine.options('abhor', random.Random(1))
+    assert options[0] == engine._definitions['abhor'][1]
+    assert len(set(options)) == 3
+    assert engine.options('notaword') is None
+
+def test_stored_definitions_are_read_once_and_do_not_replace_bundled_ones(monkeypatch):
+    reads = []
+    def stored():
+        reads.append(1)
+        return iter([('abhor', 'Stored definition of abhor'), ('Newword', 'A stored definition')])
+    monkeypatch.setattr(local_options, 'get_stored_definitions', stored)
+    engine = LocalOptionEngine()
+    assert not engine.loaded
+    bundled = engine._definitions['abhor'][1]
+
+    engine.options('newword')
+    engine.load_stored()
+    engine.options('abhor')
+
+    assert engine.loaded and len(reads) == 1
+    assert engine.options('newword')[0] == 'A stored definition'
+    assert engine.options('abhor')[0] == bundled
+
+def test_failed_load_is_not_retried_on_every_question(monkeypatch):
+    reads = []
+    def unavailable():
+        reads.append(1)
+        raise RuntimeError('database down')
+    monkeypatch.setattr(local_options, 'get_stored_definitions', unavailable)
+    engine = LocalOptionEngine()
+    engine.options('abhor')
+    engine.options('abhor')
+    assert engine.loaded and len(reads) == 1
@@ -0,0 +1,63 @@
+import re
+import pytest
+from sqlalchemy import text
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+import database
+import main
+import metrics
+
+def sample(name, **labels):
+    """The value of one sample in the /metrics output, or None."""
+    label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+    pattern = re.escape(name + (f'{{{label_text}}}' if labels else '')) + r' (\S+)'
+    match = re.search('^' + pattern + '$', metrics.render(), re.M)
+    return float(match.group(1)) if match else None
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main.warmer, '_started', True)
+    return TestClient(main.app)
+
+def test_requests_are_timed_by_route_template(client):
+    before = sample('http_request_duration_seconds_count', method='GET', route='/config/words', status=200) or 0
+    client.get('/config/words', params={'q': 'ab'})
+    client.get('/config/words', params={'q': 'ac'})
+    assert sample('http_request_duration_seconds_count',
+                  method='GET', route='/config/words', status=200) == before + 2
+    assert sample('http_request_db_queries_count', route='/config/words') >= 2
+
+def test_metrics_endpoint_includes_the_stats_callbacks_once(client):
+    page = client.get('/metrics').text
+    for name in ('option_cache_lookups_total', 'option_cache_size', 'warmer_generated_total',
+                 'warmer_in_flight', 'db_pool_connects_total', 'db_pool_info', 'llm_breaker_open'):
+        assert page.count(f'# TYPE {name} ') == 1, name
+    assert re.search(r'^option_cache_lookups_total\{result="memory_hits"\} \d+$', page, re.M)
+
+def test_failed_statements_are_counted_and_do_not_leak_start_times():
+    engine = database.get_engine()
+    before = sample('db_errors_total', error='OperationalError') or 0
+    with engine.connect() as conn:
+        with pytest.raises(Exception):
+            conn.execute(text('SELECT * FROM no_such_table'))
+        assert conn.info.get('query_started') == []
+        conn.execute(text('SELECT 1'))
+        assert conn.info.get('query_started') == []
+    assert sample('db_errors_total', error='OperationalError') == before + 1
+
+def test_server_timing_reports_app_and_database_time():
+    def page(request):
+        database.count_words()
+        database.get_words_page(limit=1)
+        return PlainTextResponse('ok')
+    app = metrics.MetricsMiddleware(Starlette(routes=[Route('/timed', page)]), server_timing=True)
+    header = TestClient(app).get('/timed').headers['server-timing']
+    assert re.fullmatch(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="queries: \d+"', header)
+
+def test_callbacks_skip_missing_values_and_survive_errors():
+    assert metrics.Callback('empty_metric', 'Nothing yet.', lambda: None).render() == []
+    assert metrics.Callback('broken_metric', 'Fails.', lambda: 1 / 0).render() == []
+    lines = metrics.Callback('labelled', 'With labels.', lambda: [({'kind': 'a"b'}, 2), ({'kind': 'c'}, None)]).render()
+    assert lines[2:] == ['labelled{kind="a\\"b"} 2']
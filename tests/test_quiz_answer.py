@@ -0,0 +1,46 @@
+import re
+import pytest
+from starlette.testclient import TestClient
+import main
+
+BUTTON = re.compile(r'hx-get="/quiz/answer/(\w+)/(\d)"[^>]*>([^<]*)</button>')
+WORD = re.compile(r'class="quiz-word">([^<]*)<')
+
+@pytest.fixture
+def client(monkeypatch):
+    # Render whole questions rather than streaming them, so the options are in the page
+    monkeypatch.setattr(main, 'STREAM_QUESTIONS', False)
+    return TestClient(main.app)
+
+def question(page):
+    """(word, question id, option texts) of the question card in a page."""
+    buttons = BUTTON.findall(page)
+    return WORD.search(page).group(1), buttons[0][0], [text for _, _, text in buttons]
+
+def no_llm(word):
+    raise AssertionError(f'options for {word!r} were requested again')
+
+def test_wrong_answer_shows_the_option_the_student_saw_without_a_new_call(client, monkeypatch):
+    word, question_id, options = question(client.get('/quiz').text)
+    correct = options.index(f'The meaning of {word}')
+    monkeypatch.setattr(main, 'get_quiz_options', no_llm)
+
+    page = client.get(f'/quiz/answer/{question_id}/{(correct + 1) % 3}').text
+
+    assert 'Incorrect!' in page
+    assert f'The correct answer was: The meaning of {word}' in page
+    assert 'Streak: 0' in page
+
+def test_right_answer_advances_the_round(client, monkeypatch):
+    word, question_id, options = question(client.get('/quiz').text)
+    monkeypatch.setattr(main, 'get_quiz_options', no_llm)
+
+    page = client.get(f'/quiz/answer/{question_id}/{options.index(f"The meaning of {word}")}').text
+
+    assert 'Correct! Well done!' in page
+    assert 'Streak: 1' in page and '>1/' in page
+
+def test_a_question_can_only_be_answered_once(client):
+    word, question_id, options = question(client.get('/quiz').text)
+    client.get(f'/quiz/answer/{question_id}/0')
+    assert 'already been answered' in client.get(f'/quiz/answer/{question_id}/0').text
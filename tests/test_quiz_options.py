@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+import quiz_options
+from resilience import CircuitBreaker
+from quiz_options import check_options, parse_options, repair_models
+
+def options(*texts, correct=0):
+    return [{'text': text, 'correct': i == correct} for i, text in enumerate(texts)]
+
+GOOD = options('Happy and cheerful', 'Sad and gloomy', 'Tired and sleepy')
+
+def tool_message(arguments, stop_reason='tool_use'):
+    call = SimpleNamespace(type='tool_use', id='toolu_1', name='record_options', input=arguments)
+    return SimpleNamespace(model='test-model', content=[call], stop_reason=stop_reason)
+
+def test_check_options_accepts_three_balanced_options_with_one_correct():
+    assert check_options(GOOD) is None
+
+@pytest.mark.parametrize('value, reason', [
+    (None, 'malformed'),
+    (['Happy', 'Sad', 'Tired'], 'malformed'),
+    ([{'text': 'Happy', 'correct': 'yes'}] * 3, 'malformed'),
+    (GOOD[:2], 'wrong_count'),
+    (GOOD + options('Hungry and thirsty', correct=None), 'wrong_count'),
+    (options('Happy and cheerful', '  ', 'Tired and sleepy'), 'empty'),
+    (options('Happy and cheerful', 'happy and cheerful ', 'Tired and sleepy'), 'duplicate'),
+    (options('Happy and cheerful', 'Sad and gloomy', 'Tired and sleepy', correct=None), 'correct_count'),
+    ([dict(o, correct=True) for o in GOOD], 'correct_count'),
+    (options('Happy and cheerful', 'Sad and gloomy', 'Feeling tired after a very long day of hard work at school'),
+     'unbalanced'),
+])
+def test_check_options_rejects(value, reason):
+    assert check_options(value)[0] == reason
+
+def test_short_options_are_measured_as_the_minimum_length():
+    assert check_options(options('Glad', 'Sad', 'Feeling tired and sleepy')) is None
+
+def test_parse_options_reports_why_an_answer_was_rejected():
+    assert parse_options(tool_message({'options': GOOD}, stop_reason='max_tokens'))[1][0] == 'truncated'
+    assert parse_options(SimpleNamespace(model='m', content=[], stop_reason='end_turn'))[1][0] == 'no_tool_call'
+    assert parse_options(tool_message({'options': GOOD[:2]}))[1][0] == 'wrong_count'
+
+def test_repair_request_returns_the_rejected_call_with_the_problem():
+    request = quiz_options.build_request('serene')
+    repair = quiz_options.build_repair_request(request, tool_message({'options': GOOD[:2]}),
+                                               ('wrong_count', 'Give exactly 3.'))
+    assistant, user = repair['messages'][-2:]
+    assert assistant['content'][0]['id'] == user['content'][0]['tool_use_id'] == 'toolu_1'
+    assert user['content'][0]['is_error'] and 'Give exactly 3.' in user['content'][0]['content']
+    assert request['messages'] == repair['messages'][:1]
+
+def test_repair_models_allows_a_single_repair():
+    assert repair_models(['a', 'b', 'c']) == ['a', 'b']
+    assert repair_models(['a']) == ['a', 'a']
+
+class RejectedClient:
+    """An async client whose answers always fail validation."""
+
+    def __init__(self):
+        self.models = []
+        self.messages = self
+
+    async def create(self, model, **request):
+        self.models.append(model)
+        return tool_message({'options': GOOD[:2]})
+
+def test_request_path_makes_at_most_one_repair_call(monkeypatch):
+    monkeypatch.setattr(quiz_options, 'MODELS', ['model-a', 'model-b', 'model-c'])
+    monkeypatch.setattr(quiz_options, 'llm_breaker', CircuitBreaker())
+    client = RejectedClient()
+
+    assert asyncio.run(quiz_options.agenerate_quiz_options('serene', client)) == (None, None)
+    assert client.models == ['model-a', 'model-b']
@@ -0,0 +1,116 @@
+import json
+import database
+import quiz_session
+from quiz_session import current_word, load_state, new_state, save_state, session_id, start_round
+
+def test_state_round_trips_through_the_session_row():
+    session = {}
+    state = new_state()
+    start_round(state, ['abhor', 'abject', 'acumen'])
+    state['position'] = 1
+    state['streak'] = 4
+    state['question'] = ['q1', 'abject', ['a', 'b', 'c'], 2, 123]
+    save_state(session, state)
+
+    loaded = load_state(dict(session))
+    assert loaded == state
+    assert current_word(loaded) == 'abject'
+
+def test_each_session_gets_its_own_state():
+    first, second = {}, {}
+    state = new_state()
+    start_round(state, ['abhor', 'abject'])
+    state['streak'] = 2
+    save_state(first, state)
+
+    assert session_id(first) != session_id(second)
+    assert load_state(second) == new_state()
+    assert load_state(first)['streak'] == 2
+
+def test_state_from_another_version_starts_fresh():
+    session = {}
+    database.save_quiz_state(session_id(session), json.dumps({'v': quiz_session.STATE_VERSION - 1, 's': 3}))
+    assert load_state(session) == new_state()
+    database.save_quiz_state(session_id(session), 'not json')
+    assert load_state(session) == new_state()
+
+def counting(monkeypatch, name):
+    calls = []
+    original = getattr(quiz_session, name)
+    def wrapper(*args):
+        calls.append(args)
+        return original(*args)
+    monkeypatch.setattr(quiz_session, name, wrapper)
+    return calls
+
+def test_deck_is_written_once_per_round_not_per_answer(monkeypatch):
+    writes = counting(monkeypatch, 'save_quiz_deck')
+    words = [word for _, word in database.cached_active_words()]
+    session = {}
+    state = new_state()
+    start_round(state, words)
+    save_state(session, state)
+    for _ in range(3):
+        state = load_state(session)
+        state['position'] += 1
+        state['streak'] += 1
+        save_state(session, state)
+    assert len(writes) == 1
+
+    # Only the small per-answer row is rewritten, whatever the size of the deck
+    row = database.load_quiz_state(session_id(session))
+    assert len(row) < 100 and words[0] not in row
+
+    quiz_session.restart_round(state, words[3])
+    save_state(session, state)
+    assert len(writes) == 2
+    assert load_state(session)['deck'] == state['deck']
+
+def test_deck_is_read_once_per_instance(monkeypatch):
+    session = {}
+    state = new_state()
+    start_round(state, ['abhor', 'abject', 'acumen'])
+    save_state(session, state)
+    quiz_session._decks.clear()
+    reads = counting(monkeypatch, 'load_quiz_deck')
+
+    assert current_word(load_state(session)) == 'abhor'
+    assert current_word(load_state(session)) == 'abhor'
+    assert len(reads) == 1
+
+def test_deck_from_another_round_starts_fresh():
+    session = {}
+    state = new_state()
+    start_round(state, ['abhor', 'abject'])
+    save_state(session, state)
+    # Another tab started a new round and then this one saved its own answer
+    database.save_quiz_deck(session_id(session), 'otherround', '[]')
+    quiz_session._decks.clear()
+    assert load_state(session) == new_state()
+
+def test_words_removed_during_a_round_are_skipped():
+    word_ids = [database.add_word(word) for word in ('decka', 'deckb', 'deckc', 'deckd')]
+    session = {}
+    state = new_state()
+    start_round(state, ['decka', 'deckb', 'deckc', 'deckd'])
+    state['position'] = 1
+    save_state(session, state)
+    database.remove_word(word_ids[1])
+    database.remove_word(word_ids[2])
+
+    state = load_state(session)
+    assert quiz_session.upcoming_words(state, 2) == ['deckd']
+    assert current_word(state) == 'deckd'
+    database.remove_word(word_ids[0])
+    database.remove_word(word_ids[3])
+
+def test_restart_brings_the_missed_word_back_soon():
+    state = new_state()
+    start_round(state, [f'w{i}' for i in range(10)])
+    state['position'] = 6
+    deck = state['deck']
+    quiz_session.restart_round(state, 'w6')
+    assert state['position'] == 0
+    assert state['deck'][quiz_session.RELEARN_GAP] == 'w6'
+    assert sorted(state['deck']) == sorted(deck)
+    assert quiz_session.upcoming_words(state, 2) == state['deck'][1:3]
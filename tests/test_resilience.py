@@ -0,0 +1,82 @@
+import pytest
+import resilience
+from resilience import CircuitBreaker, LatencyWindow
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, slo_seconds=5, cooldown=30)
+    for _ in range(2):
+        breaker.record(False)
+    assert breaker.allow()
+    breaker.record(True)
+    for _ in range(3):
+        breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()['trips'] == 1 and breaker.stats()['rejected'] == 1
+
+def test_calls_slower_than_the_slo_count_as_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, slo_seconds=1, cooldown=30)
+    breaker.record(True, 0.5)
+    breaker.record(True, 2.0)
+    breaker.record(True, 3.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_half_open_lets_one_trial_through_after_the_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, slo_seconds=5, cooldown=30)
+    breaker.record(False)
+    clock[0] += 29
+    assert not breaker.allow()
+    clock[0] += 1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+def test_failed_trial_opens_the_breaker_again(clock):
+    breaker = CircuitBreaker(failure_threshold=1, slo_seconds=5, cooldown=30)
+    breaker.record(False)
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    assert breaker.stats()['trips'] == 2
+
+def test_trial_that_never_reports_back_does_not_block_forever(clock):
+    breaker = CircuitBreaker(failure_threshold=1, slo_seconds=5, cooldown=30)
+    breaker.record(False)
+    clock[0] += 30
+    assert breaker.allow()
+    clock[0] += 30
+    assert breaker.allow()
+
+def test_retry_after_counts_down_the_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, slo_seconds=5, cooldown=30)
+    assert breaker.retry_after() == 0
+    breaker.record(False)
+    clock[0] += 10
+    assert breaker.retry_after() == 20
+    clock[0] += 25
+    assert breaker.retry_after() == 0 and breaker.allow()
+    # Half open: whether a call may go through is up to allow()
+    assert breaker.retry_after() == 0
+
+def test_latency_window_needs_enough_samples():
+    window = LatencyWindow(size=100, min_samples=10)
+    for i in range(9):
+        window.add(i)
+    assert window.percentile(95) is None
+    for i in range(9, 100):
+        window.add(i)
+    assert window.percentile(50) == 50
+    assert window.percentile(95) == 95
+    # Only the most recent samples are kept
+    for _ in range(100):
+        window.add(1000)
+    assert window.percentile(50) == 1000
@@ -0,0 +1,49 @@
+import secrets
+from datetime import datetime, timedelta
+import database
+from database import WordProgress
+from scheduler import LEITNER_INTERVALS, order_round, record_answer
+
+def progress(sid, word):
+    db = database.get_session()
+    try:
+        return db.query(WordProgress.box, WordProgress.due_at).join(
+            database.VocabWord, database.VocabWord.id == WordProgress.word_id
+        ).filter(WordProgress.session_id == sid, database.VocabWord.word == word).one()
+    finally:
+        db.close()
+
+def test_right_answers_move_a_word_up_and_a_wrong_one_back_to_the_start():
+    sid = secrets.token_hex(16)
+    record_answer(sid, 'abhor', True, 1200)
+    record_answer(sid, 'abhor', True, 900)
+    box, due_at = progress(sid, 'abhor')
+    assert box == 2
+    assert due_at - datetime.utcnow() > timedelta(seconds=LEITNER_INTERVALS[2] - 60)
+
+    record_answer(sid, 'abhor', False)
+    assert progress(sid, 'abhor').box == 0
+
+def test_box_stops_at_the_last_interval():
+    sid = secrets.token_hex(16)
+    for _ in range(len(LEITNER_INTERVALS) + 2):
+        record_answer(sid, 'abject', True)
+    assert progress(sid, 'abject').box == len(LEITNER_INTERVALS) - 1
+
+def test_unknown_words_are_not_recorded():
+    assert record_answer(secrets.token_hex(16), 'notinthelist', True) is False
+
+def test_due_words_start_the_round_most_overdue_first():
+    sid = secrets.token_hex(16)
+    words = ['abhor', 'abject', 'acumen', 'adamant', 'adept', 'admonish']
+    # Missed words are due straight away, so order by when they were missed
+    for word in ('adept', 'abject'):
+        record_answer(sid, word, False)
+    record_answer(sid, 'acumen', True)
+
+    deck = order_round(sid, words)
+
+    assert deck[:2] == ['adept', 'abject']
+    assert sorted(deck) == sorted(words)
+    # Another session's history does not affect this one
+    assert set(order_round(secrets.token_hex(16), words)) == set(words)
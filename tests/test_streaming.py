@@ -0,0 +1,102 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import fake_anthropic
+import quiz_options
+from fake_anthropic import FakeAsyncAnthropic
+from quiz_options import OptionsParser, arrange, correct_first, parse_options
+
+def options(*texts, correct=0):
+    return [{'text': text, 'correct': i == correct} for i, text in enumerate(texts)]
+
+def tool_message(arguments, stop_reason='tool_use'):
+    call = SimpleNamespace(type='tool_use', id='toolu_1', name='record_options', input=arguments)
+    return SimpleNamespace(model='test-model', content=[call], stop_reason=stop_reason)
+
+def test_correct_first_uses_the_label_not_the_position():
+    assert correct_first(options('Sad', 'Happy', 'Tired', correct=1)) == ['Happy', 'Sad', 'Tired']
+
+def test_parse_options_returns_the_labelled_option_first():
+    result, problem = parse_options(tool_message({'options': options(
+        'Sad and gloomy', 'Tired and sleepy', 'Happy and cheerful', correct=2)}))
+    assert problem is None
+    assert result == ['Happy and cheerful', 'Sad and gloomy', 'Tired and sleepy']
+
+def test_options_parser_yields_each_option_once_it_is_complete():
+    text = json.dumps({'options': options('Calm, "peaceful" {still}', 'Loud', 'Angry')})
+    parser = OptionsParser()
+    seen = []
+    for i in range(0, len(text), 5):
+        seen.append(parser.feed(text[i:i + 5]))
+    assert [o for found in seen for o in found] == ['Calm, "peaceful" {still}', 'Loud', 'Angry']
+    assert parser.complete
+    # Nothing is yielded until the first object has fully arrived
+    assert seen[0] == []
+
+def test_options_parser_ignores_text_before_the_options_array():
+    parser = OptionsParser()
+    assert parser.feed('{"note": "options", "options": [') == []
+    assert parser.feed('{"correct": true, "text": "Calm"}, ') == ['Calm']
+    assert parser.feed('{"text": "Loud", "correct": false}]}') == ['Loud']
+    assert parser.complete and parser.options == ['Calm', 'Loud']
+
+def test_arrange_puts_the_correct_option_at_the_index_and_keeps_the_streamed_order():
+    assert arrange(['Right', 'Wrong 1', 'Wrong 2'], 2, order=['Wrong 2', 'Right', 'Wrong 1']) == \
+        ['Wrong 2', 'Wrong 1', 'Right']
+    shown = arrange(['Right', 'Wrong 1', 'Wrong 2'], 1)
+    assert shown[1] == 'Right' and sorted(shown) == ['Right', 'Wrong 1', 'Wrong 2']
+
+async def consume(word, correct_index, client, stop_after=None):
+    """(streamed (position, option) pairs, final list) from stream_quiz_options."""
+    streamed = []
+    stream = quiz_options.stream_quiz_options(word, correct_index, client)
+    async for position, result in stream:
+        if position is None:
+            return streamed, result
+        streamed.append((position, result))
+        if len(streamed) == stop_after:
+            await stream.aclose()
+            return streamed, None
+
+def test_stream_yields_options_then_the_final_list_with_the_correct_one_in_place():
+    client = FakeAsyncAnthropic()
+    streamed, final = asyncio.run(consume('streamone', 2, client))
+    assert final[2] == 'The meaning of streamone'
+    assert [option for _, option in streamed] == final
+    assert quiz_options.peek_options('streamone')[0] == 'The meaning of streamone'
+    # Served from the cache the second time, without a call
+    streamed, cached = asyncio.run(consume('streamone', 0, client))
+    assert streamed == [] and cached[0] == 'The meaning of streamone' and sorted(cached) == sorted(final)
+    assert client.calls == 1
+
+def test_concurrent_requests_for_a_cold_word_share_one_stream(monkeypatch):
+    monkeypatch.setattr(fake_anthropic, 'LATENCY_MS', 50)
+    client = FakeAsyncAnthropic()
+    monkeypatch.setattr(quiz_options, 'async_anthropic', client)
+
+    async def main():
+        return await asyncio.gather(*[consume('streamshared', i % 3, client) for i in range(5)],
+                                    quiz_options.get_quiz_options('streamshared'))
+
+    *streams, fetched = asyncio.run(main())
+    assert client.calls == 1
+    assert fetched[0] == 'The meaning of streamshared'
+    for i, (_, final) in enumerate(streams):
+        assert final[i % 3] == 'The meaning of streamshared'
+    assert not quiz_options._in_flight
+
+def test_a_stream_stopped_part_way_releases_its_waiters(monkeypatch):
+    monkeypatch.setattr(fake_anthropic, 'LATENCY_MS', 50)
+    client = FakeAsyncAnthropic()
+    monkeypatch.setattr(quiz_options, 'async_anthropic', client)
+
+    async def main():
+        first = asyncio.ensure_future(consume('streamstopped', 0, client, stop_after=1))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(quiz_options.get_quiz_options('streamstopped'))
+        return await first, await asyncio.wait_for(waiter, 1)
+
+    (streamed, final), fallback = asyncio.run(main())
+    assert len(streamed) == 1 and final is None
+    assert fallback == quiz_options.fallback_options('streamstopped')
+    assert not quiz_options._in_flight
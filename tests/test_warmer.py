@@ -0,0 +1,122 @@
+import json
+import random
+import pytest
+import fake_anthropic
+import quiz_options
+from fake_anthropic import FakeAnthropic
+from resilience import CircuitBreaker
+from warmer import OptionWarmer
+
+def recording_client(reject_once=()):
+    """A FakeAnthropic that logs (model, words, succeeded) for every batch call.
+
+    Words in reject_once come back with duplicate options the first time they
+    are asked for, so the batch only partly succeeds.
+    """
+    client = FakeAnthropic()
+    create = client.messages.create
+    client.requests = []
+    rejected = set()
+
+    def recording_create(**request):
+        words = json.loads(request['messages'][0]['content'].split('WORDS: ', 1)[1])
+        try:
+            message = create(**request)
+        except fake_anthropic.FakeAPIError:
+            client.requests.append((request['model'], words, False))
+            raise
+        for item in message.content[0].input['items']:
+            if item['word'] in reject_once and item['word'] not in rejected:
+                rejected.add(item['word'])
+                item['options'][1]['text'] = item['options'][0]['text']
+        client.requests.append((request['model'], words, True))
+        return message
+
+    client.messages.create = recording_create
+    return client
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    # Three words per call, and a breaker that never opens on simulated failures
+    monkeypatch.setattr(quiz_options, 'BATCH_MAX_TOKENS', 300)
+    monkeypatch.setattr(quiz_options, 'batch_breaker', CircuitBreaker(failure_threshold=10 ** 6))
+
+def test_retries_only_regenerate_failed_words(monkeypatch):
+    monkeypatch.setattr(fake_anthropic, 'FAILURE_RATE', 0.4)
+    random.seed(3)
+    words = [f'retryword{i}' for i in range(12)]
+    client = recording_client()
+    warmer = OptionWarmer(max_attempts=10, backoff=0, client=client)
+
+    warmer._generate(words)
+
+    assert warmer.generated == len(words) and warmer.failed == 0
+    assert any(not ok for _, _, ok in client.requests)
+    generated = set()
+    for _, asked, ok in client.requests:
+        # A word is never asked for again once it has been generated
+        assert not generated & set(asked)
+        if ok:
+            generated.update(asked)
+    assert generated == set(words)
+    assert all(quiz_options.peek_options(word) is not None for word in words)
+
+def test_partial_batch_failure_retries_only_rejected_words():
+    words = [f'partialword{i}' for i in range(6)]
+    client = recording_client(reject_once={'partialword1', 'partialword4'})
+    warmer = OptionWarmer(max_attempts=3, backoff=0, client=client)
+
+    warmer._generate(words)
+
+    asked = [chunk for _, chunk, _ in client.requests]
+    assert asked == [words[:3], words[3:], ['partialword1', 'partialword4']]
+    assert warmer.generated == 6 and warmer.failed == 0
+    assert quiz_options.peek_options('partialword4')[0] == 'The meaning of partialword4'
+
+def test_gives_up_after_max_attempts_moving_up_the_model_ladder(monkeypatch):
+    monkeypatch.setattr(fake_anthropic, 'FAILURE_RATE', 1.0)
+    monkeypatch.setattr(quiz_options, 'MODELS', ['model-a', 'model-b'])
+    words = [f'failingword{i}' for i in range(2)]
+    client = recording_client()
+    warmer = OptionWarmer(max_attempts=3, backoff=0, client=client)
+
+    warmer._generate(words)
+
+    assert [model for model, _, _ in client.requests] == ['model-a', 'model-b', 'model-b']
+    assert warmer.generated == 0 and warmer.failed == 2
+    assert warmer.stats()['in_flight'] == 0
+
+def test_waits_out_an_open_breaker_without_using_up_attempts(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.2)
+    breaker.record(False)
+    monkeypatch.setattr(quiz_options, 'batch_breaker', breaker)
+    words = [f'outageword{i}' for i in range(2)]
+    client = recording_client()
+    warmer = OptionWarmer(max_attempts=1, backoff=0, client=client)
+
+    warmer._generate(words)
+
+    assert [chunk for _, chunk, _ in client.requests] == [words]
+    assert warmer.generated == 2 and warmer.failed == 0
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_shutdown_stops_waiting_for_the_breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=3600)
+    breaker.record(False)
+    monkeypatch.setattr(quiz_options, 'batch_breaker', breaker)
+    warmer = OptionWarmer(backoff=0, client=recording_client())
+    warmer.shutdown()
+
+    warmer._generate(['stoppedword'])
+
+    assert warmer.failed == 0 and warmer.stats()['in_flight'] == 0
+
+def test_batches_do_not_touch_the_request_path_breaker(monkeypatch):
+    request_breaker = CircuitBreaker(failure_threshold=2)
+    request_breaker.record(False)
+    monkeypatch.setattr(quiz_options, 'llm_breaker', request_breaker)
+
+    results, skipped = quiz_options.generate_options_batch(['batchonly'], client=recording_client())
+
+    assert list(results) == ['batchonly'] and skipped == []
+    assert request_breaker.stats()['consecutive_failures'] == 1
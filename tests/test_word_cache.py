@@ -0,0 +1,48 @@
+import database
+from database import WordListCache, add_word, get_word_list_version, remove_word
+
+def test_word_list_cache_patches_its_own_writes_without_reloading():
+    cache = WordListCache(ttl=60)
+    before = cache.get()
+    version = cache.version()
+    cache.added([(10**6, 'patched')], version + 1)
+    assert cache.get() == before + ((10**6, 'patched'),)
+    assert cache.reloads == 1
+    cache.removed(10**6, version + 2)
+    assert cache.get() == before and cache.reloads == 1
+
+def test_word_list_cache_reloads_when_it_missed_a_write():
+    cache = WordListCache(ttl=60)
+    cache.get()
+    word_id = add_word('cachegap')
+    # The module cache saw this write, ours did not: a later version must not be patched in
+    cache.added([(10**6, 'patched')], get_word_list_version() + 1)
+    rows = cache.get()
+    assert (word_id, 'cachegap') in rows and (10**6, 'patched') not in rows
+    assert cache.reloads == 2
+    remove_word(word_id)
+
+def test_word_list_cache_notices_other_writers_after_the_ttl():
+    fresh, stale = WordListCache(ttl=0), WordListCache(ttl=3600)
+    fresh.get(), stale.get()
+    word_id = add_word('otherwriter')
+    assert (word_id, 'otherwriter') in fresh.get()
+    assert (word_id, 'otherwriter') not in stale.get()
+    remove_word(word_id)
+    assert (word_id, 'otherwriter') not in fresh.get()
+
+def test_word_list_cache_lookups_are_rebuilt_only_when_the_list_changes():
+    cache = WordListCache(ttl=60)
+    by_word, by_id = cache.lookups()
+    assert all(by_word[word] == word_id and by_id[word_id] == word for word_id, word in cache.get())
+    assert cache.lookups()[0] is by_word
+    cache.added([(10**6, 'patched')], cache.version() + 1)
+    assert cache.lookups()[0]['patched'] == 10**6
+
+def test_add_word_patches_the_shared_cache():
+    database.word_list_cache.get()
+    reloads = database.word_list_cache.reloads
+    word_id = add_word('sharedcache')
+    assert (word_id, 'sharedcache') in database.cached_active_words()
+    assert database.word_list_cache.reloads == reloads
+    remove_word(word_id)
@@ -0,0 +1,83 @@
+import re
+import pytest
+from starlette.testclient import TestClient
+import database
+import main
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main.warmer, '_started', True)
+    monkeypatch.setattr(main.warmer, 'warm', lambda words: len(words))
+    return TestClient(main.app)
+
+def word_id(word):
+    by_word, _ = database.cached_word_lookups()
+    return by_word[word]
+
+def test_added_word_is_sent_as_one_tile_after_the_word_before_it(client):
+    page = client.post('/add-word', data={'new-word': 'Abhorrent', 'cursor': '', 'q': ''}).text
+    assert f'afterend:#word-{word_id("abhor")}' in page
+    assert page.count('class="word-tile"') == 1
+    assert f'Total words: {database.count_words()}' in page
+    database.remove_word(word_id('abhorrent'))
+
+def test_added_word_the_page_has_not_loaded_or_filtered_out_only_updates_the_count(client):
+    beyond = client.post('/add-word', data={'new-word': 'zzzbeyond', 'cursor': 'benign', 'q': ''}).text
+    hidden = client.post('/add-word', data={'new-word': 'abhorred', 'cursor': '', 'q': 'zz'}).text
+    for page in (beyond, hidden):
+        assert 'word-tile' not in page and 'Total words' in page
+    database.remove_word(word_id('zzzbeyond'))
+    database.remove_word(word_id('abhorred'))
+
+def test_duplicate_word_adds_no_tile(client):
+    page = client.post('/add-word', data={'new-word': 'abhor'}).text
+    assert 'word-tile' not in page and 'Total words' in page
+
+def test_removing_a_word_only_updates_the_count(client):
+    new_id = database.add_word('removeme')
+    total = database.count_words()
+    page = client.delete(f'/remove-word/{new_id}').text
+    assert re.search(rf'id="word-count"[^>]*>Total words: {total - 1}<', page)
+    assert 'removeme' not in {word for _, word in database.cached_active_words()}
+
+def test_keyset_pages_walk_the_whole_list_in_order():
+    seen, after, after_id = [], None, 0
+    while True:
+        page = database.get_words_page(after, after_id, limit=7)
+        seen.extend(page)
+        if len(page) < 7:
+            break
+        after, after_id = page[-1].word.lower(), page[-1].id
+    words = [row.word for row in seen]
+    assert words == sorted(words, key=str.lower)
+    assert len(set(words)) == len(words) == database.count_words()
+
+def test_search_matches_the_start_of_words_unless_asked_to_match_anywhere():
+    assert [row.word for row in database.get_words_page(query='AB')] == \
+        ['aberration', 'abhor', 'abject', 'abridge', 'abstemious']
+    anywhere = [row.word for row in database.get_words_page(query='bje', match='contains')]
+    assert anywhere == ['abject']
+    assert database.get_words_page(query='bje') == []
+
+def test_search_wildcards_are_matched_literally():
+    new_id = database.add_word('per%cent_sign')
+    assert [row.word for row in database.get_words_page(query='%c', match='contains')] == ['per%cent_sign']
+    assert [row.word for row in database.get_words_page(query='t_s', match='contains')] == ['per%cent_sign']
+    assert database.get_words_page(query='a_', match='contains') == []
+    database.remove_word(new_id)
+
+def test_previous_word_follows_the_search():
+    assert database.get_previous_word_id('abjure') == word_id('abject')
+    assert database.get_previous_word_id('abjure', 'abr') is None
+    assert database.get_previous_word_id('acz', 'ac') == word_id('acumen')
+
+def test_full_page_ends_with_a_loader_for_the_next_one(client, monkeypatch):
+    monkeypatch.setattr(main, 'WORDS_PAGE_SIZE', 3)
+    page = client.get('/config/words', params={'q': 'a'}).text
+    assert page.count('class="word-tile"') == 3
+    assert 'hx-trigger="intersect once"' in page
+    assert f'after=abject&amp;after_id={word_id("abject")}' in page
+    assert 'id="word-list-cursor"' in page and 'value="abject"' in page
+
+    last = client.get('/config/words', params={'q': 'ab', 'after': 'abject', 'after_id': word_id('abject')}).text
+    assert last.count('class="word-tile"') == 2 and 'intersect' not in last
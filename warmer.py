@@ -0,0 +1,140 @@
+"""Background pre-generation of quiz options.
+
+Words that have no stored option set are generated in batches on a small
+thread pool so quiz requests are almost always served from the cache.
+"""
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import quiz_options
+import metrics
+from local_options import engine as local_engine
+
+try:
+    from database import get_words_missing_options
+except Exception as e:
+    print(f"Warning: Warmer database unavailable: {e}")
+    def get_words_missing_options(models, prompt_version): return []
+
+# Seconds between checks while another call holds the batch breaker's half-open trial
+BREAKER_POLL = 1.0
+
+class OptionWarmer:
+    def __init__(self, concurrency=4, max_attempts=4, backoff=1.0, client=None):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.client = client
+        self._executor = None
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._started = False
+        self._stopping = threading.Event()
+        self.generated = 0
+        self.failed = 0
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                thread_name_prefix='option-warmer')
+        return self._executor
+
+    def warm(self, words):
+        """Queue words for generation. Words already queued are skipped."""
+        queued = []
+        with self._lock:
+            for word in words:
+                key = word.strip().lower()
+                if key and key not in self._in_flight:
+                    self._in_flight.add(key)
+                    queued.append(key)
+        # Words are generated a chunk per LLM call rather than one call each
+        for chunk in quiz_options.batch_chunks(queued):
+            self._pool().submit(self._generate, chunk)
+        return len(queued)
+
+    def warm_missing(self):
+        """Queue every active word without a stored option set."""
+        try:
+            words = get_words_missing_options(quiz_options.MODELS, quiz_options.PROMPT_VERSION)
+        except Exception as e:
+            print(f"Error finding words to warm: {e}")
+            return 0
+        count = self.warm(words)
+        if count:
+            print(f"Warming quiz options for {count} words")
+        return count
+
+    def start(self):
+        """Run warm_missing once on the worker pool, so the database is first
+        touched off the event loop and only when the app is actually used.
+        Stored definitions for offline options are loaded alongside it."""
+        with self._lock:
+            if self._started:
+                return False
+            self._started = True
+        self._pool().submit(self.warm_missing)
+        self._pool().submit(local_engine.load_stored)
+        return True
+
+    def _generate(self, words):
+        remaining = list(words)
+        try:
+            remaining = [w for w in remaining if quiz_options.peek_options(w) is None]
+            attempt = 0
+            while remaining and attempt < self.max_attempts:
+                # Words that keep failing move up the model ladder, one model per attempt
+                model = quiz_options.MODELS[min(attempt, len(quiz_options.MODELS) - 1)]
+                results, skipped = quiz_options.generate_options_batch(remaining, client=self.client, model=model)
+                if results:
+                    quiz_options.store_option_sets(results, model)
+                    with self._lock:
+                        self.generated += len(results)
+                if len(skipped) == len(remaining):
+                    # Nothing was sent while the breaker is open, so wait it out
+                    # without using up an attempt, however long the outage lasts
+                    if self._stopping.wait(quiz_options.batch_breaker.retry_after() or BREAKER_POLL):
+                        return
+                    continue
+                attempt += 1
+                # Only the words that failed are retried
+                remaining = [w for w in remaining if w not in results]
+                if remaining and attempt < self.max_attempts:
+                    # Exponential backoff with jitter so retries do not arrive in lockstep
+                    time.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+            if remaining:
+                with self._lock:
+                    self.failed += len(remaining)
+                print(f"Giving up warming options for {len(remaining)} words after {self.max_attempts} attempts")
+        finally:
+            with self._lock:
+                self._in_flight.difference_update(words)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._in_flight),
+                'generated': self.generated,
+                'failed': self.failed,
+                'concurrency': self.concurrency
+            }
+
+    def shutdown(self):
+        self._stopping.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+warmer = OptionWarmer(
+    concurrency=int(os.getenv('WARM_CONCURRENCY', '4')),
+    max_attempts=int(os.getenv('WARM_MAX_ATTEMPTS', '4'))
+)
+
+metrics.register(metrics.Callback('warmer_generated_total', 'Option sets generated in the background.',
+                                  lambda: warmer.stats()['generated'], 'counter'))
+metrics.register(metrics.Callback('warmer_failed_total', 'Words the background warmer gave up on.',
+                                  lambda: warmer.stats()['failed'], 'counter'))
+metrics.register(metrics.Callback('warmer_in_flight', 'Words queued or being generated in the background.',
+                                  lambda: warmer.stats()['in_flight']))